@@ -1,21 +1,81 @@
-from app.game import Game
-from mpi4py import MPI
-from setup import MPILogger, WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT, SHARKS_NUMBER, FISH_NUMBER
+from app.config import configure, parse_arguments
 import time
 
 if __name__ == '__main__':
+    # Settings from --config and the command line are in place before any module reads them
+    settings, options = parse_arguments()
+    configure(settings)
+    from app.benchmark import Benchmark, get_runs
+    from app.headless import play
+    from app.render import render_trajectory
+    from app.models.streams import get_seed
+    from app.sweep import Sweep
+    from app.trajectory import TrajectoryReader
+    from setup import MPILogger, BENCHMARK, BENCHMARK_BLOCK, BENCHMARK_ENGINES, BENCHMARK_FILE, \
+        BENCHMARK_FISH_DENSITY, BENCHMARK_GENERATIONS, BENCHMARK_RANKS, BENCHMARK_REPORT, BENCHMARK_SEED, \
+        BENCHMARK_SHARKS_DENSITY, BENCHMARK_SIZES, BENCHMARK_THREADS, ENGINE, HEADLESS, INITIAL_FRAME, \
+        INITIAL_TRAJECTORY, MAX_GENERATIONS, PERIODIC, WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT, SHARKS_NUMBER, \
+        FISH_NUMBER, DATA_DIR, DECOMPOSITION_DIMS, RENDER, RENDER_SCALE, RENDER_VIEW, RENDER_WORKERS, SEED, SWEEP, \
+        SWEEP_EXECUTOR, SWEEP_FILE, SWEEP_GRID, SWEEP_SEEDS, SWEEP_WORKERS, TRAJECTORY_FILE
+
+    if RENDER:
+        render_trajectory(TRAJECTORY_FILE, DATA_DIR + '/world-{:04d}.png', RENDER_VIEW, RENDER_SCALE, RENDER_WORKERS)
+        exit()
+
+    if SWEEP:
+        sweep = Sweep(SWEEP_FILE, SWEEP_GRID, SWEEP_SEEDS,
+                      {'length': WORLD_LENGTH, 'width': WORLD_WIDTH, 'height': WORLD_HEIGHT, 'fish_number': FISH_NUMBER,
+                       'sharks_number': SHARKS_NUMBER, 'generations': MAX_GENERATIONS,
+                       'engine': 'ensemble' if SWEEP_EXECUTOR == 'ensemble' else ENGINE, 'periodic': PERIODIC})
+        if SWEEP_EXECUTOR == 'mpi':
+            from mpi4py import MPI
+            sweep.run_mpi(MPI.COMM_WORLD)
+        elif SWEEP_EXECUTOR == 'ensemble':
+            sweep.run_ensemble(SWEEP_WORKERS)
+        else:
+            sweep.run(SWEEP_WORKERS)
+        exit()
+
+    if BENCHMARK:
+        benchmark = Benchmark(BENCHMARK_FILE, BENCHMARK_REPORT,
+                              get_runs(BENCHMARK_RANKS, BENCHMARK_SIZES, BENCHMARK_BLOCK, BENCHMARK_GENERATIONS,
+                                       BENCHMARK_ENGINES, BENCHMARK_FISH_DENSITY, BENCHMARK_SHARKS_DENSITY,
+                                       BENCHMARK_SEED, BENCHMARK_THREADS), settings)
+        print(benchmark.write_report(benchmark.run()))
+        exit()
+
+    if HEADLESS:
+        process_start_time = time.process_time()
+        seed = get_seed(SEED)
+        species = None
+        if INITIAL_TRAJECTORY is not None:
+            species = TrajectoryReader(INITIAL_TRAJECTORY).get_initial_species(
+                (WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT), INITIAL_FRAME)
+        fishes, sharks = play(WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT, FISH_NUMBER, SHARKS_NUMBER, MAX_GENERATIONS,
+                              ENGINE, PERIODIC, seed, species)
+        for generation in range(1, MAX_GENERATIONS + 1):
+            print('Generation {}/{}: Fishes: {}, Sharks: {}'.format(generation, MAX_GENERATIONS, fishes[generation],
+                                                                    sharks[generation]))
+        print('The process duration was: {}'.format(time.process_time() - process_start_time))
+        print('The seed was: {}'.format(seed))
+        exit()
+
+    # MPI is only loaded for distributed runs
+    from app.decomposition import Decomposition
+    from app.game import Game
+    from mpi4py import MPI
 
     comm = MPI.COMM_WORLD
     size: int = comm.Get_size()
     rank: int = comm.Get_rank()
     name: str = MPI.Get_processor_name()
-    if rank is 0:
+    if rank == 0:
         MPILogger.info('Rank : {} from processor: {} will be used for managing other processes.'.format(rank, name))
     try:
-        assert WORLD_WIDTH % (size - 1) == 0
+        assert Decomposition((WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT), size - 1, DECOMPOSITION_DIMS, PERIODIC).fits()
     except AssertionError:
-        print('Number of processes are not equally divided.')
-        MPILogger.error('Number of processes are not equally divided.')
+        print('There are more blocks than cells along an axis of the world.')
+        MPILogger.error('There are more blocks than cells along an axis of the world.')
         exit()
 
     try:
@@ -25,30 +85,12 @@ if __name__ == '__main__':
         MPILogger.error('The world is to small for all the creatures.')
         exit()
 
-    if rank is 0:
-        MPILogger.info('Starting rank: {} to partition data to other processes.'.format(rank))
-        for process in range(1, size):
-            world_length: int = WORLD_LENGTH
-            world_width: int = (WORLD_WIDTH // (size - 1)) + 2
-            world_height: int = WORLD_HEIGHT
-            fishes_number: int = FISH_NUMBER // (size - 1)
-            sharks_number: int = SHARKS_NUMBER // (size - 1)
-            data = {'length': world_length,
-                    'width': world_width,
-                    'height': world_height,
-                    'fishes': fishes_number,
-                    'sharks': sharks_number
-                    }
-            comm.send(data, dest=process, tag=9)
-            MPILogger.info('Data send to process {}.'.format(process))
-        game = Game(WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT, FISH_NUMBER, SHARKS_NUMBER)
+    # Every process works out its own block of the world from the global sizes
+    # With --restart the world is read back from the last checkpoint instead of being populated
+    game = Game(WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT, FISH_NUMBER, SHARKS_NUMBER, restart=options.restart)
+    if rank == 0:
         process_start_time = game.process_start_time
         process_stop_time = time.process_time()
         print('The process duration was: {}'.format(process_stop_time - process_start_time))
-    else:
-        data = comm.recv(source=0, tag=9)
-        MPILogger.info('Process {} received data from process 0.'.format(rank))
-        if rank in [1, size - 1]:
-            game = Game(data['length'], data['width'] - 1, data['height'], data['fishes'], data['sharks'])
-        else:
-            game = Game(data['length'], data['width'], data['height'], data['fishes'], data['sharks'])
+        print('The wall time was: {}'.format(game.profiler.wall_time))
+        print(game.profiler.format_summary())
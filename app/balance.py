@@ -0,0 +1,108 @@
+import numpy
+from mpi4py import MPI
+
+from app.decomposition import Decomposition
+from app.models.world import World
+
+
+def get_balanced_cuts(profile, blocks: int) -> list:
+    # Boundaries that split the load profile of an axis evenly, every block keeping at least one cell
+    size = len(profile)
+    cumulative = numpy.cumsum(profile)
+    inner = numpy.arange(1, blocks)
+    cuts = numpy.searchsorted(cumulative, cumulative[-1] * inner / blocks) + 1
+    cuts = numpy.clip(cuts, inner, size - blocks + inner)
+    cuts = numpy.maximum.accumulate(cuts - inner) + inner
+    return [0] + cuts.tolist() + [size]
+
+
+def get_intersection(first: tuple, second: tuple) -> tuple:
+    box = tuple((max(first_start, second_start), min(first_stop, second_stop))
+                for (first_start, first_stop), (second_start, second_stop) in zip(first, second))
+    return box if all(stop > start for start, stop in box) else None
+
+
+def get_local_box(box: tuple, block: tuple, interior: tuple) -> tuple:
+    return tuple(slice(start - block_start + axis.start, stop - block_start + axis.start)
+                 for (start, stop), (block_start, _), axis in zip(box, block, interior))
+
+
+class LoadBalancer:
+    TAG = 50
+
+    def __init__(self, comm: MPI.Comm, decomposition: Decomposition, interval: int, threshold: float,
+                 cell_weight: float):
+        # Every rank of `comm` takes part in the decision, rank 0 only follows it with no load of its own
+        self.comm = comm
+        self.decomposition = decomposition
+        self.interval = interval
+        self.threshold = threshold
+        self.cell_weight = cell_weight
+        self.step_time = 0.0
+
+    def is_due(self, generation: int) -> bool:
+        return self.interval > 0 and generation > 0 and generation % self.interval == 0
+
+    def record(self, seconds: float) -> None:
+        self.step_time += seconds
+
+    def balance(self, world: World = None, interior: tuple = None, index: int = None) -> bool:
+        # Step times of all the workers since the last check, the slowest one holding everyone back
+        times = numpy.zeros(self.decomposition.workers)
+        if world is not None:
+            times[index] = self.step_time
+        self.comm.Allreduce(MPI.IN_PLACE, times, op=MPI.SUM)
+        self.step_time = 0.0
+        if times.mean() == 0 or times.max() < self.threshold * times.mean():
+            return False
+
+        # Every worker spreads its step time over its cells by creature, giving a load profile along each axis
+        profiles = [numpy.zeros(size) for size in self.decomposition.shape]
+        if world is not None:
+            positions, _, _ = world.get_region_creatures(interior)
+            shape = world.get_region_shape(interior)
+            scale = times[index] / (len(positions[0]) + self.cell_weight * numpy.prod(shape))
+            for axis, ((start, stop), profile) in enumerate(zip(self.decomposition.get_block(index), profiles)):
+                plane = numpy.prod(shape) // shape[axis]
+                profile[start:stop] = (numpy.bincount(positions[axis], minlength=shape[axis]) +
+                                       self.cell_weight * plane) * scale
+        profiles = numpy.concatenate(profiles)
+        self.comm.Allreduce(MPI.IN_PLACE, profiles, op=MPI.SUM)
+        profiles = numpy.split(profiles, numpy.cumsum(self.decomposition.shape)[:-1])
+
+        cuts = [get_balanced_cuts(profile, blocks) if blocks > 1 else old
+                for profile, blocks, old in zip(profiles, self.decomposition.dims, self.decomposition.cuts)]
+        if cuts == self.decomposition.cuts:
+            return False
+        self.decomposition.cuts = cuts
+        return True
+
+    def redistribute(self, cart: MPI.Comm, world: World, old_blocks: list, interior: tuple) -> World:
+        # Cells, and the creatures in them, move to the worker whose new block holds them
+        index: int = cart.Get_rank()
+        new_blocks = self.decomposition.get_blocks()
+        new_world = type(world)(*self.decomposition.get_local_shape(index), world.periodic)
+        new_world.random = world.random
+        new_world.generation = world.generation
+        new_interior = self.decomposition.get_interior(index)
+        requests, pieces = list(), list()
+        for worker in range(self.decomposition.workers):
+            box = get_intersection(old_blocks[index], new_blocks[worker])
+            if box is not None:
+                region = get_local_box(box, old_blocks[index], interior)
+                buffer = numpy.zeros(world.get_region_shape(region), dtype=World.CELL_DTYPE)
+                world.pack_region(region, buffer)
+                requests.append(cart.Isend([buffer, MPI.BYTE], dest=worker, tag=self.TAG))
+                pieces.append((None, buffer))
+            box = get_intersection(new_blocks[index], old_blocks[worker])
+            if box is not None:
+                region = get_local_box(box, new_blocks[index], new_interior)
+                buffer = numpy.zeros(new_world.get_region_shape(region), dtype=World.CELL_DTYPE)
+                requests.append(cart.Irecv([buffer, MPI.BYTE], source=worker, tag=self.TAG))
+                pieces.append((region, buffer))
+        MPI.Request.Waitall(requests)
+        for region, buffer in pieces:
+            if region is not None:
+                new_world.set_region(region, buffer)
+        new_world.refresh_creatures()
+        return new_world
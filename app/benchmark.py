@@ -0,0 +1,145 @@
+import csv
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy
+
+from app.config import configure
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLE = ('scaling', 'engine', 'shape', 'ranks', 'workers', 'threads', 'wall_time', 'speedup', 'efficiency',
+         'cells_per_second', 'creatures_per_second')
+
+
+def get_runs(ranks, sizes, block: tuple, generations: int, engines, fish_density: float, sharks_density: float,
+             seed: int, threads=(1,)) -> list:
+    # Strong scaling keeps every world of `sizes` on all rank counts, weak scaling stacks one `block` per worker
+    # along the width, the axis the default decomposition cuts. Every run is repeated for each count of `threads`
+    runs = list()
+    for engine, number_ranks, number_threads in itertools.product(engines, ranks, threads):
+        workers = number_ranks - 1
+        shapes = [('strong', tuple(size)) for size in sizes] + [('weak', (block[0], block[1] * workers, block[2]))]
+        for scaling, shape in shapes:
+            cells = int(numpy.prod(shape))
+            runs.append({'scaling': scaling, 'engine': engine, 'ranks': number_ranks, 'shape': shape,
+                         'fish_number': int(cells * fish_density), 'sharks_number': int(cells * sharks_density),
+                         'generations': generations, 'seed': seed, 'threads': number_threads})
+    return runs
+
+
+def measure(run: dict) -> dict:
+    # Runs inside the MPI job, only rank 0 gets a result
+    from app.game import Game, rank
+    from app.profiler import PHASES
+
+    game = Game(*run['shape'], run['fish_number'], run['sharks_number'], run['engine'],
+                generations=run['generations'], seed=run['seed'])
+    if rank != 0:
+        return None
+    profiler = game.profiler
+    cells = int(numpy.prod(run['shape'])) * len(game.generations)
+    return dict(run, wall_time=profiler.wall_time, generation_times=profiler.timings.sum(axis=1).tolist(),
+                phases={phase: profiler.timings[:, column].tolist() for column, phase in enumerate(PHASES)},
+                cells_per_second=cells / profiler.wall_time,
+                creatures_per_second=int(profiler.creatures.sum()) / profiler.wall_time)
+
+
+def get_row(scaling: str, result: dict, speedup: float, efficiency: float) -> dict:
+    return {'scaling': scaling, 'engine': result['engine'], 'shape': 'x'.join(map(str, result['shape'])),
+            'ranks': result['ranks'], 'workers': result['ranks'] - 1, 'threads': result.get('threads', 1),
+            'wall_time': result['wall_time'], 'speedup': speedup, 'efficiency': efficiency,
+            'cells_per_second': result['cells_per_second'], 'creatures_per_second': result['creatures_per_second']}
+
+
+def get_scaling(results: list, scaling: str) -> list:
+    # Speedup and efficiency are taken against the fewest workers a configuration ran on; a weak scaling run is ideal
+    # when its time stays the same, its speedup is then the growth in workers
+    rows = list()
+    runs = sorted((result for result in results if result['scaling'] == scaling),
+                  key=lambda result: (result['engine'], str(result['shape']) if scaling == 'strong' else '',
+                                      result.get('threads', 1), result['ranks']))
+    for _, group in itertools.groupby(runs, key=lambda result: (result['engine'], str(result['shape'])
+                                                                if scaling == 'strong' else '',
+                                                                result.get('threads', 1))):
+        group = list(group)
+        base_time, base_workers = group[0]['wall_time'], group[0]['ranks'] - 1
+        for result in group:
+            workers = result['ranks'] - 1
+            ratio = base_time / result['wall_time']
+            speedup = ratio if scaling == 'strong' else ratio * workers / base_workers
+            rows.append(get_row(scaling, result, speedup, speedup * base_workers / workers))
+    return rows
+
+
+def get_threading(results: list) -> list:
+    # The strong scaling runs again, every world on one rank count taken against its fewest threads
+    rows = list()
+    runs = sorted((result for result in results if result['scaling'] == 'strong'),
+                  key=lambda result: (result['engine'], str(result['shape']), result['ranks'],
+                                      result.get('threads', 1)))
+    for _, group in itertools.groupby(runs, key=lambda result: (result['engine'], str(result['shape']),
+                                                                result['ranks'])):
+        group = list(group)
+        if len(group) == 1:
+            continue
+        base_time, base_threads = group[0]['wall_time'], group[0].get('threads', 1)
+        for result in group:
+            speedup = base_time / result['wall_time']
+            rows.append(get_row('threads', result, speedup, speedup * base_threads / result.get('threads', 1)))
+    return rows
+
+
+def format_table(rows: list) -> str:
+    cells = [['{:.4g}'.format(row[column]) if isinstance(row[column], float) else str(row[column]) for column in TABLE]
+             for row in rows]
+    widths = [max(len(line[column]) for line in cells + [list(TABLE)]) for column in range(len(TABLE))]
+    return '\n'.join(' '.join(value.rjust(width) for value, width in zip(line, widths))
+                     for line in [list(TABLE)] + cells)
+
+
+class Benchmark:
+    def __init__(self, filename: str, report: str, runs: list, settings: dict = None):
+        self.filename = filename
+        self.report = report
+        self.runs = runs
+        # Settings given to this process, from a config file or the command line, hold in the jobs too
+        self.settings = settings or dict()
+
+    def launch(self, run: dict) -> dict:
+        # Every run is a fresh MPI job, so that each rank count gets its own processes
+        command = ['mpiexec', '-n', str(run['ranks']), sys.executable, '-m', 'app.benchmark',
+                   json.dumps(dict(run, settings=dict(self.settings, THREADS=run['threads'])))]
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=True)
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def run(self) -> list:
+        # Results are appended one JSON line per run, so that later benchmarks can be compared with earlier ones
+        results = list()
+        date = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(self.filename, 'a') as file:
+            for run in self.runs:
+                result = dict(self.launch(run), date=date)
+                file.write(json.dumps(result) + '\n')
+                file.flush()
+                results.append(result)
+        return results
+
+    def write_report(self, results: list) -> str:
+        tables = [get_scaling(results, scaling) for scaling in ('strong', 'weak')] + [get_threading(results)]
+        with open(self.report, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=TABLE)
+            writer.writeheader()
+            for rows in tables:
+                writer.writerows(rows)
+        return '\n\n'.join(format_table(rows) for rows in tables if rows)
+
+
+if __name__ == '__main__':
+    run = json.loads(sys.argv[1])
+    configure(run.pop('settings'))
+    result = measure(run)
+    if result is not None:
+        print(json.dumps(result))
@@ -0,0 +1,68 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+
+from app.models.world import World
+
+
+def get_cuts(axis: slice, size: int, block: int, periodic: bool) -> list:
+    # Blocks of at least `block` cells, differing by at most one. Across a periodic axis the last block touches the
+    # first, so there is an even number of them
+    start, stop, _ = axis.indices(size)
+    count = max(1, (stop - start) // block)
+    if periodic and count > 1 and count % 2:
+        count -= 1
+    return [slice(start + (stop - start) * index // count, start + (stop - start) * (index + 1) // count)
+            for index in range(count)]
+
+
+def get_colours(region: tuple, shape: tuple, periodic: tuple, blocks: tuple) -> list:
+    # Sub-blocks of the region in up to 8 colours, by the parity of their place along every axis. Blocks of one colour
+    # are a whole block, at least two cells, apart: what a creature of one reads or moves into, its cells and their
+    # neighbours, never meets what another reads or moves into
+    cuts = [list(enumerate(get_cuts(axis, size, max(block, 2), wrapped)))
+            for axis, size, wrapped, block in zip(region, shape, periodic, blocks)]
+    colours = [list() for _ in range(8)]
+    for blocks in itertools.product(*cuts):
+        colour = sum((index % 2) << axis for axis, (index, _) in enumerate(blocks))
+        colours[colour].append(tuple(axis for _, axis in blocks))
+    return [colour for colour in colours if colour]
+
+
+class BlockScheduler:
+    def __init__(self, threads: int = 1, block: int = 0):
+        # Regions evolve one colour of sub-blocks after the other, the blocks of a colour spread over `threads` threads;
+        # the NumPy kernels release the GIL while they run. Blocks are cubes of `block` cells, the trajectory then
+        # depending on the block size only, or else 2 * `threads` slabs across the longest axis of the region. One
+        # thread and no block size evolve whole regions as before.
+        self.threads = threads
+        self.block = block
+        self.executor = ThreadPoolExecutor(threads) if threads > 1 else None
+
+    def get_blocks(self, region: tuple, shape: tuple) -> tuple:
+        if self.block:
+            return (self.block,) * 3
+        lengths = [len(range(*axis.indices(size))) for axis, size in zip(region, shape)]
+        longest = int(numpy.argmax(lengths))
+        return tuple(length // (2 * self.threads) if axis == longest else length
+                     for axis, length in enumerate(lengths))
+
+    def evolve(self, world: World, region: tuple) -> None:
+        # Engines without block kernels evolve the whole region at once; sparse records are rebuilt by every move, so
+        # they cannot be shared by threads either
+        if not (self.block or self.executor) or not hasattr(world, 'evolve_block') or getattr(world, 'SPARSE', False):
+            world.evolve_region(region)
+            return
+        events = numpy.zeros(3, dtype=numpy.int64)
+        for blocks in get_colours(region, world.shape, world.periodic, self.get_blocks(region, world.shape)):
+            if self.executor is None:
+                results = [world.evolve_block(block) for block in blocks]
+            else:
+                results = list(self.executor.map(world.evolve_block, blocks))
+            events += numpy.sum(results, axis=0, dtype=numpy.int64)
+        world.add_events(*(int(number) for number in events))
+        world.refresh_creatures()
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
@@ -0,0 +1,84 @@
+import json
+import os
+import numpy
+from mpi4py import MPI
+
+from app.models.world import World
+
+MANIFEST = 'checkpoint.json'
+
+
+def get_data_file(directory: str, generation: int) -> str:
+    return os.path.join(directory, 'checkpoint-{:06d}.bin'.format(generation))
+
+
+def read_manifest(directory: str) -> dict:
+    # The manifest is only replaced once a checkpoint is complete, so it always names a consistent one; its data file
+    # is named relative to the directory, which may have been moved since
+    with open(os.path.join(directory, MANIFEST)) as file:
+        manifest = json.load(file)
+    manifest['data'] = os.path.join(directory, manifest['data'])
+    return manifest
+
+
+def load_block(manifest: dict, block: tuple):
+    # Cells are read back by global position, so the world may be cut into a different number of blocks
+    cells = numpy.memmap(manifest['data'], dtype=World.CELL_DTYPE, mode='r', shape=tuple(manifest['shape']))
+    return numpy.array(cells[tuple(slice(*axis) for axis in block)])
+
+
+class CheckpointWriter:
+    def __init__(self, comm: MPI.Comm, directory: str, shape: tuple, seed: int):
+        # `comm` holds the workers only, its rank 0 writes the manifest
+        self.comm = comm
+        self.rank: int = comm.Get_rank()
+        self.directory = directory
+        self.shape = tuple(shape)
+        self.seed = seed
+        self.cell_type = MPI.BYTE.Create_contiguous(World.CELL_DTYPE.itemsize).Commit()
+        self.file = None
+        self.filetype = None
+        self.request = MPI.REQUEST_NULL
+        self.buffer = numpy.zeros(0, dtype=World.CELL_DTYPE)
+        self.manifest = None
+        if self.rank == 0:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self, generation: int, world: World, interior: tuple, block: tuple, cuts: list) -> None:
+        # The interior is copied out, then written in the background while the world keeps evolving
+        self.finish()
+        self.buffer = numpy.zeros(world.get_region_shape(interior), dtype=World.CELL_DTYPE)
+        world.pack_region(interior, self.buffer)
+        states = self.comm.gather(world.random.bit_generator.state, root=0)
+        filename = get_data_file(self.directory, generation)
+        self.file = MPI.File.Open(self.comm, filename, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        self.filetype = self.cell_type.Create_subarray(self.shape, self.buffer.shape,
+                                                       tuple(start for start, _ in block)).Commit()
+        self.file.Set_view(0, self.cell_type, self.filetype)
+        self.request = self.file.Iwrite_all([self.buffer, self.buffer.size, self.cell_type])
+        if self.rank == 0:
+            self.manifest = {'generation': generation, 'seed': self.seed, 'shape': self.shape,
+                             'data': os.path.basename(filename),
+                             'workers': self.comm.Get_size(), 'cuts': cuts, 'states': states}
+
+    def finish(self) -> None:
+        if self.file is None:
+            return
+        self.request.Wait()
+        self.file.Close()
+        self.filetype.Free()
+        self.file = None
+        if self.rank == 0:
+            previous = read_manifest(self.directory)['data'] if os.path.exists(
+                os.path.join(self.directory, MANIFEST)) else None
+            temporary = os.path.join(self.directory, MANIFEST + '.tmp')
+            with open(temporary, 'w') as file:
+                json.dump(self.manifest, file)
+            os.replace(temporary, os.path.join(self.directory, MANIFEST))
+            current = get_data_file(self.directory, self.manifest['generation'])
+            if previous is not None and previous != current and os.path.exists(previous):
+                os.remove(previous)
+
+    def close(self) -> None:
+        self.finish()
+        self.cell_type.Free()
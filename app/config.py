@@ -0,0 +1,86 @@
+import argparse
+import ast
+import json
+import os
+
+import setup
+
+# Every upper-case constant of setup.py is a setting, its default the value written there
+SETTINGS = tuple(name for name, value in vars(setup).items() if name.isupper() and not callable(value))
+# Seeds recorded in trajectory headers, as signed 64-bit integers
+SEEDS = ('SEED', 'BENCHMARK_SEED')
+SEED_LIMIT = 2 ** 63
+# Output paths left unset, by their names in DATA_DIR; they follow DATA_DIR until given a value of their own
+DATA_FILES = {'CHECKPOINT_DIR': 'checkpoints', 'SWEEP_FILE': 'sweep.csv', 'BENCHMARK_FILE': 'benchmark.jsonl',
+              'BENCHMARK_REPORT': 'scaling.csv', 'STATISTICS_FILE': 'statistics.csv', 'TRAJECTORY_FILE': 'world.traj'}
+derived = set()
+
+
+def get_option(name: str) -> str:
+    return '--' + name.lower().replace('_', '-')
+
+
+def get_value(name: str, value):
+    # Command line values are read as Python literals, bare words as strings; lists become tuples and integers
+    # floats where setup.py expects them
+    kind = setup.__annotations__.get(name)
+    if isinstance(value, str) and kind is not str:
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass
+    if isinstance(value, list):
+        value = tuple(tuple(item) if isinstance(item, list) else item for item in value)
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        value = float(value)
+    if kind is not None and value is not None and not isinstance(value, kind):
+        raise ValueError('The setting {} takes a {}, not {!r}.'.format(name, kind.__name__, value))
+    return value
+
+
+def read_config(filename: str) -> dict:
+    # A JSON object of settings, by their names in setup.py in any case
+    with open(filename) as file:
+        return {name.upper(): value for name, value in json.load(file).items()}
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Sharks and fishes in a 3D world.')
+    parser.add_argument('--config', help='JSON file of settings, given options override it')
+    parser.add_argument('--restart', action='store_true', help='carry on from the last complete checkpoint')
+    parser.add_argument('--log', action='store_true', help='write the MPI and debug logs')
+    for name in SETTINGS:
+        parser.add_argument(get_option(name), dest=name, metavar='VALUE',
+                            help='default {!r}'.format(getattr(setup, name)).replace('%', '%%'))
+    return parser
+
+
+def parse_arguments(arguments: list = None) -> tuple:
+    # Settings from the config file then the command line, and the flags of this run
+    options = get_parser().parse_args(arguments)
+    settings = read_config(options.config) if options.config is not None else dict()
+    settings.update({name: getattr(options, name) for name in SETTINGS if getattr(options, name) is not None})
+    if options.log:
+        settings['LOGGING'] = True
+    return settings, options
+
+
+def configure(settings: dict) -> None:
+    # Settings replace the constants of setup.py before the modules reading them are imported
+    for name, value in settings.items():
+        if name not in SETTINGS:
+            raise ValueError('There is no setting {}.'.format(name))
+        setattr(setup, name, get_value(name, value))
+    for name, filename in DATA_FILES.items():
+        if name in settings and settings[name] is not None:
+            derived.discard(name)
+        elif getattr(setup, name) is None or name in derived:
+            setattr(setup, name, os.path.join(setup.DATA_DIR, filename))
+            derived.add(name)
+    # Checked on every process alike, before any of them waits on another
+    for name in SEEDS:
+        seed = getattr(setup, name)
+        if seed is not None and not 0 <= seed < SEED_LIMIT:
+            raise ValueError('The setting {} takes a seed from 0 to 2**63 - 1, not {}.'.format(name, seed))
+    if setup.LOGGING:
+        setup.init_logging()
@@ -0,0 +1,59 @@
+import numpy
+from mpi4py import MPI
+
+
+class Decomposition:
+    def __init__(self, shape: tuple, workers: int, dims: tuple = (1, 0, 1), periodic=False):
+        self.shape = tuple(shape)
+        self.workers = workers
+        self.periodic = periodic if isinstance(periodic, tuple) else (periodic,) * 3
+        # Axes left at 0 are cut by MPI into as even a grid of blocks as the number of workers allows
+        self.dims = tuple(MPI.Compute_dims(workers, list(dims)))
+        # Block boundaries along every axis; blocks along an axis start out differing by at most one cell
+        self.cuts = [[coord * size // blocks for coord in range(blocks + 1)]
+                     for size, blocks in zip(self.shape, self.dims)]
+
+    def fits(self) -> bool:
+        return all(size >= blocks for size, blocks in zip(self.shape, self.dims))
+
+    def get_coords(self, index: int) -> tuple:
+        # Workers are laid out in row-major order, as in a Cartesian communicator that is not reordered
+        return tuple(int(coord) for coord in numpy.unravel_index(index, self.dims))
+
+    def get_block(self, index: int) -> tuple:
+        return tuple((cuts[coord], cuts[coord + 1]) for coord, cuts in zip(self.get_coords(index), self.cuts))
+
+    def get_blocks(self) -> list:
+        return [self.get_block(index) for index in range(self.workers)]
+
+    def get_ghosts(self, index: int) -> tuple:
+        # A ghost layer on each side of a block that has a neighbour on that side, across the seam of periodic axes
+        return tuple((blocks > 1 and (coord > 0 or periodic), blocks > 1 and (coord < blocks - 1 or periodic))
+                     for coord, blocks, periodic in zip(self.get_coords(index), self.dims, self.periodic))
+
+    def get_local_periodic(self) -> tuple:
+        # A periodic axis that is not cut wraps around inside every block, with no ghost layers
+        return tuple(periodic and blocks == 1 for periodic, blocks in zip(self.periodic, self.dims))
+
+    def get_local_shape(self, index: int) -> tuple:
+        return tuple(stop - start + lower + upper
+                     for (start, stop), (lower, upper) in zip(self.get_block(index), self.get_ghosts(index)))
+
+    def get_interior(self, index: int) -> tuple:
+        return tuple(slice(int(lower), int(lower) + stop - start)
+                     for (start, stop), (lower, _) in zip(self.get_block(index), self.get_ghosts(index)))
+
+    def get_neighbour(self, index: int, offset) -> int:
+        coords = numpy.array(self.get_coords(index)) + offset
+        dims = numpy.array(self.dims)
+        wrapped = numpy.array(self.periodic) & (dims > 1)
+        coords[wrapped] %= dims[wrapped]
+        if ((coords < 0) | (coords >= dims)).any() or (numpy.not_equal(offset, 0) & (dims == 1)).any():
+            return None
+        return int(numpy.ravel_multi_index(tuple(coords), self.dims))
+
+    def get_share(self, number: int, index: int) -> int:
+        # Creatures are spread in proportion to the cells of every block, the shares adding up to `number`
+        cells = [numpy.prod([stop - start for start, stop in self.get_block(worker)]) for worker in range(index + 1)]
+        total = numpy.prod(self.shape)
+        return int(number * sum(cells) // total - number * sum(cells[:-1]) // total)
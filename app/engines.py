@@ -0,0 +1,35 @@
+import numpy
+
+from app.models.sparse_world import SparseWorld
+from app.models.vectorized_world import VectorizedWorld
+from app.models.world import World
+
+ENGINES = {'object': World, 'vectorized': VectorizedWorld, 'sparse': SparseWorld}
+
+
+def select_engine(engine: str, density: float, threshold: float, current: type = None) -> type:
+    # 'auto' keeps the creatures as records while they fill under `threshold` of the cells and as grids once they
+    # fill over twice as many, in between the current engine stays so that it does not flip every check
+    if engine != 'auto':
+        return ENGINES[engine]
+    if density < threshold:
+        return SparseWorld
+    if density > 2 * threshold or current is None:
+        return VectorizedWorld
+    return current
+
+
+def convert_world(world: World, world_class: type) -> World:
+    # Creatures, counters and random streams carry over, the run goes on as if nothing happened
+    converted = world_class(*world.shape, world.periodic)
+    region = (slice(None),) * 3
+    data = numpy.zeros(world.shape, dtype=World.CELL_DTYPE)
+    world.pack_region(region, data)
+    converted.set_region(region, data)
+    converted.refresh_creatures()
+    converted.interior = world.interior
+    converted.random = world.random
+    converted.streams = world.streams
+    converted.generation = world.generation
+    converted.births, converted.deaths, converted.predations = world.births, world.deaths, world.predations
+    return converted
@@ -1,12 +1,24 @@
 import time
 import numpy
-import threading
 from mpi4py import MPI
 
-from app.models.fish import Fish
-from app.models.shark import Shark
-from app.models.world import World
-from setup import MPILogger, DebugLogger, DATA_DIR, MAX_GENERATIONS, WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT
+from app.balance import LoadBalancer
+from app.blocks import BlockScheduler
+from app.checkpoint import CheckpointWriter, load_block, read_manifest
+from app.decomposition import Decomposition
+from app.engines import convert_world, select_engine
+from app.halo import HaloExchange
+from app.models.streams import CellStreams, get_seed
+from app.parallel_output import CollectiveTrajectoryWriter
+from app.profiler import Profiler
+from app.statistics import Statistics
+from app.snapshots import SnapshotCollector, SnapshotSender, get_local_region, get_region
+from app.trajectory import TrajectoryReader
+from setup import MPILogger, BALANCE_CELL_WEIGHT, BALANCE_INTERVAL, BALANCE_THRESHOLD, CHECKPOINT_DIR, \
+    CHECKPOINT_INTERVAL, COLLECTIVE_OUTPUT, DECOMPOSITION_DIMS, ENGINE, INITIAL_FRAME, INITIAL_TRAJECTORY, \
+    MAX_GENERATIONS, OUTPUT_FORMATS, PERIODIC, PIPELINED_HALO, PROFILE, PROFILE_TRACE, SEED, SNAPSHOT_EXECUTOR, \
+    SNAPSHOT_INTERVAL, SNAPSHOT_QUEUE, SNAPSHOT_REGION, SNAPSHOT_WRITERS, SPARSE_CHECK_INTERVAL, SPARSE_DENSITY, \
+    STATISTICS, STATISTICS_AXIS, STATISTICS_ENERGY_BINS, STATISTICS_FILE, THREAD_BLOCK, THREADS, TRAJECTORY_FILE
 
 comm = MPI.COMM_WORLD
 size: int = comm.Get_size()
@@ -14,158 +26,199 @@ rank: int = comm.Get_rank()
 
 
 class Game:
-    def __init__(self, world_length: int, world_width: int, world_height: int, fish_number: int, sharks_number: int):
+    def __init__(self, world_length: int, world_width: int, world_height: int, fish_number: int, sharks_number: int,
+                 engine: str = ENGINE, restart: bool = False, generations: int = MAX_GENERATIONS, seed: int = SEED):
         self.world_length = world_length
         self.world_width = world_width
         self.world_height = world_height
         self.fish_number = fish_number
         self.sharks_number = sharks_number
         self.process_start_time = time.process_time()
-        self.threads = list()
-
-        if rank is 0:
-            world = World(WORLD_LENGTH, WORLD_WIDTH, WORLD_HEIGHT)
+        self.engine = engine
+        self.world_class = select_engine(engine, (fish_number + sharks_number) /
+                                         (world_length * world_width * world_height), SPARSE_DENSITY)
+
+        decomposition = Decomposition((world_length, world_width, world_height), size - 1, DECOMPOSITION_DIMS,
+                                      PERIODIC)
+        region = get_region(SNAPSHOT_REGION, world_length, world_width, world_height)
+        snapshots = range(0, generations, SNAPSHOT_INTERVAL) if SNAPSHOT_INTERVAL else range(0)
+        collective = COLLECTIVE_OUTPUT and 'trajectory' in OUTPUT_FORMATS
+        funnelled_formats = tuple(output for output in OUTPUT_FORMATS if not (collective and output == 'trajectory'))
+        region_shape = tuple(stop - start for start, stop in region)
+        # Workers get a communicator of their own, laid out as a grid of blocks
+        workers = comm.Split(0 if rank == 0 else 1, rank)
+        # Every process agrees on one seed: evolution draws are keyed by it, each worker places and merges
+        # creatures with a stream of its own spawned from it
+        self.seed = comm.bcast(get_seed(seed) if rank == 0 else None, root=0)
+        first_generation = 0
+        # Trajectories and statistics of a restart drop what comes after its first generation instead of starting anew
+        resumed = None
+        if restart:
+            manifest = read_manifest(CHECKPOINT_DIR)
+            if tuple(manifest['shape']) != decomposition.shape:
+                raise ValueError('The checkpoint holds a {} world, not a {} one.'.format(tuple(manifest['shape']),
+                                                                                      decomposition.shape))
+            self.seed = manifest['seed']
+            first_generation = resumed = manifest['generation']
+            # The blocks are only kept when the workers are laid out as before, otherwise the world is cut anew
+            if [len(cuts) - 1 for cuts in manifest['cuts']] == list(decomposition.dims):
+                decomposition.cuts = manifest['cuts']
+            MPILogger.info('Process {} restarts from generation {}.'.format(rank, first_generation))
+        MPILogger.info('Process {} uses seed {}.'.format(rank, self.seed))
+        self.generations = range(first_generation, generations)
+        self.profiler = Profiler(comm, len(self.generations), PROFILE, PROFILE_TRACE)
+        # Population curves are reduced every generation from the workers' own cells, without any snapshot
+        statistics = Statistics(comm, decomposition.shape, STATISTICS_FILE, STATISTICS_AXIS, STATISTICS_ENERGY_BINS,
+                                SNAPSHOT_QUEUE, resumed) if STATISTICS else None
+
+        balancer = LoadBalancer(comm, decomposition, BALANCE_INTERVAL, BALANCE_THRESHOLD, BALANCE_CELL_WEIGHT)
+
+        if rank == 0:
+            # Rank 0 only assembles the snapshots and hands them to the writers
+            collector = SnapshotCollector(comm, decomposition, region, SNAPSHOT_WRITERS, SNAPSHOT_QUEUE,
+                                          SNAPSHOT_EXECUTOR, funnelled_formats, SNAPSHOT_INTERVAL, self.seed,
+                                          self.profiler, resumed)
+            if collective:
+                output = CollectiveTrajectoryWriter(comm, TRAJECTORY_FILE, region_shape, SNAPSHOT_INTERVAL,
+                                                    seed=self.seed, first_generation=resumed)
+            self.profiler.start()
+            for generation in self.generations:
+                if balancer.is_due(generation) and balancer.balance():
+                    collector.partition(decomposition)
+                if generation in snapshots:
+                    if funnelled_formats:
+                        collector.receive(generation)
+                    if collective:
+                        output.write(generation)
+                if statistics is not None:
+                    statistics.collect(generation + 1)
+            collector.close()
+            if statistics is not None:
+                statistics.close()
+            if collective:
+                output.close()
+            self.profiler.stop()
+            self.profiler.reduce()
+            return
+
+        cart = workers.Create_cart(decomposition.dims, periods=decomposition.periodic, reorder=False)
+        index: int = cart.Get_rank()
+        # A restart on another number of workers cannot reuse their streams, it spawns fresh ones for the generation
+        streams = numpy.random.SeedSequence(self.seed, spawn_key=(first_generation,) if first_generation else ()) \
+            .spawn(decomposition.workers)
+        world = self.world_class(*decomposition.get_local_shape(index), decomposition.get_local_periodic(),
+                                 streams[index])
+        if restart:
+            world.set_region(decomposition.get_interior(index), load_block(manifest, decomposition.get_block(index)))
+            world.refresh_creatures()
+            world.generation = first_generation
+            if manifest['workers'] == decomposition.workers:
+                world.random.bit_generator.state = manifest['states'][index]
+        elif INITIAL_TRAJECTORY is not None:
+            species = TrajectoryReader(INITIAL_TRAJECTORY).get_initial_species(decomposition.shape, INITIAL_FRAME)
+            world.populate_from_species(species[tuple(slice(*axis) for axis in decomposition.get_block(index))],
+                                        decomposition.get_interior(index))
         else:
-            world = World(self.world_length, self.world_width, self.world_height)
-            world.populate_world(self.fish_number, self.sharks_number)
-            self.update_initial_ghost_borders(world)
-
-        for generation in range(MAX_GENERATIONS):
-            world_cube = world.cube
-            gathered_cubes = comm.gather(world_cube, root=0)
-            if rank is 0:
-                thread = threading.Thread(target=self.save_game(generation, world, gathered_cubes), daemon=True)
-                # thread.start()
+            world.populate_world(decomposition.get_share(self.fish_number, index),
+                                 decomposition.get_share(self.sharks_number, index), decomposition.get_interior(index))
+        output = CollectiveTrajectoryWriter(comm, TRAJECTORY_FILE, region_shape, SNAPSHOT_INTERVAL, seed=self.seed,
+                                            first_generation=resumed) if collective else None
+        halo, sender = self.set_block(cart, world, decomposition, region, output, self.seed)
+        checkpoint = CheckpointWriter(cart, CHECKPOINT_DIR, decomposition.shape, self.seed) if CHECKPOINT_INTERVAL \
+            else None
+        scheduler = BlockScheduler(THREADS, THREAD_BLOCK)
+
+        profiler = self.profiler
+        profiler.start()
+        for step, generation in enumerate(self.generations):
+            profiler.step = step
+            phase_start_time = time.perf_counter()
+            if self.engine == 'auto' and SPARSE_CHECK_INTERVAL and step % SPARSE_CHECK_INTERVAL == 0:
+                # Every worker switches together, on the density of the whole world
+                creatures = cart.allreduce(world.number_fishes + world.number_sharks)
+                world_class = select_engine(self.engine, creatures / numpy.prod(decomposition.shape), SPARSE_DENSITY,
+                                            type(world))
+                if world_class is not type(world):
+                    MPILogger.info('Process {} switches to {}.'.format(rank, world_class.__name__))
+                    sender.close()
+                    world = convert_world(world, world_class)
+                    halo, sender = self.set_block(cart, world, decomposition, region, output, self.seed)
+            old_blocks = decomposition.get_blocks()
+            if balancer.is_due(generation) and balancer.balance(world, halo.interior, index):
+                MPILogger.info('Process {} moves to block {}.'.format(rank, decomposition.get_block(index)))
+                sender.close()
+                world = balancer.redistribute(cart, world, old_blocks, halo.interior)
+                halo, sender = self.set_block(cart, world, decomposition, region, output, self.seed)
+            phase_start_time = profiler.lap('balance', phase_start_time)
+            if checkpoint is not None and generation % CHECKPOINT_INTERVAL == 0 and generation != first_generation:
+                checkpoint.start(generation, world, halo.interior, decomposition.get_block(index), decomposition.cuts)
+                profiler.count('checkpoint_bytes', checkpoint.buffer.nbytes)
+                phase_start_time = profiler.lap('io', phase_start_time)
+            if generation in snapshots:
+                if funnelled_formats:
+                    sender.send()
+                    profiler.count('snapshot_bytes', sender.frames[0].nbytes)
+                    phase_start_time = profiler.lap('gather', phase_start_time)
+                if collective:
+                    output.write(generation)
+                    phase_start_time = profiler.lap('io', phase_start_time)
+            world.start_generation()
+            profiler.count('creatures', world.number_fishes + world.number_sharks)
+            MPILogger.info('Process {} started to update borders.'.format(rank))
+            if PIPELINED_HALO:
+                # Cells that never read a ghost cell evolve while the borders are in flight
+                halo.start()
+                phase_start_time = profiler.lap('halo', phase_start_time)
+                scheduler.evolve(world, halo.core)
+                balancer.record(time.perf_counter() - phase_start_time)
+                phase_start_time = profiler.lap('evolve', phase_start_time)
+                halo.finish()
             else:
-                MPILogger.info('Process {} started to update borders.'.format(rank))
-                self.update_ghost_borders(world)
-                world.evolve_world()
-
-    def update_ghost_borders(self, world: World) -> None:
-        if rank is not size - 1:
-            # Start sending down
-            to_down_data = numpy.zeros((self.world_length, self.world_width, self.world_height), dtype=object)
-            to_down_data[:self.world_length, 0, :self.world_height] = world.cube[:self.world_length, 0,
-                                                                      :self.world_height]
-            comm.send(to_down_data, dest=rank + 1, tag=10)
-            # End sending down
-
-        if rank is not 1:
-            # Start receiving from up
-            from_up_data = comm.recv(source=rank - 1, tag=10)
-            # End receiving from up
-            world.merge_creatures_positions_from_up(from_up_data)
-
-        if rank is not 1:
-            # Start sending to up
-            to_up_data = numpy.zeros((self.world_length, self.world_width, self.world_height), dtype=object)
-            to_up_data[:self.world_length, self.world_width - 1, :self.world_height] = world.cube[:self.world_length,
-                                                                                       self.world_width - 1,
-                                                                                       :self.world_height]
-            comm.send(to_up_data, dest=rank - 1, tag=10)
-            # End sending to up
-
-        if rank is not size - 1:
-            # Start receiving from down
-            from_down_data = comm.recv(source=rank + 1, tag=10)
-            # End receiving from down
-            world.merge_creatures_positions_from_down(from_down_data)
-
-        world.creatures = []
-        world.number_fishes = 0
-        world.number_sharks = 0
-        for index, creature in numpy.ndenumerate(world.cube):
-            if isinstance(creature, Fish) or isinstance(creature, Shark):
-                creature.x = index[0]
-                creature.y = index[1]
-                creature.z = index[2]
-                world.creatures.append(creature)
-                if isinstance(creature, Fish):
-                    world.number_fishes += 1
-                else:
-                    world.number_sharks += 1
-
-    def update_initial_ghost_borders(self, world: World) -> None:
-        if rank is not size - 1:
-            # Start sending down
-            to_down_data = numpy.zeros((self.world_length, self.world_width, self.world_height), dtype=numpy.object)
-            to_down_data[:self.world_length, 1, :self.world_height] = world.cube[:self.world_length, 1,
-                                                                      :self.world_height]
-            comm.send(to_down_data, dest=rank + 1, tag=11)
-            # End sending down
-
-        if rank is not 1:
-            # Start receiving from up
-            from_up_data = comm.recv(source=rank - 1, tag=11)
-            world.cube[:self.world_length, self.world_width - 1, :self.world_height] = from_up_data[:self.world_length,
-                                                                                       1,
-                                                                                       :self.world_height]
-            # End receiving from up
-
-        if rank is not 1:
-            # Start sending to up
-            to_up_data = numpy.zeros((self.world_length, self.world_width, self.world_height), dtype=numpy.object)
-            to_up_data[:self.world_length, self.world_width - 2, :self.world_height] = world.cube[:self.world_length,
-                                                                                       self.world_width - 2,
-                                                                                       :self.world_height]
-            comm.send(to_up_data, dest=rank - 1, tag=11)
-            # End sending to up
-
-        if rank is not size - 1:
-            # Start receiving from down
-            from_down_data = comm.recv(source=rank + 1, tag=11)
-            world.cube[:self.world_length, 0, :self.world_height] = from_down_data[:self.world_length,
-                                                                    self.world_width - 2,
-                                                                    :self.world_height]
-            # End receiving from down
-
-        # world.creatures = []
-        # world.number_fishes = 0
-        # world.number_sharks = 0
-        # for index, creature in numpy.ndenumerate(world.cube):
-        #     if isinstance(creature, Fish) or isinstance(creature, Shark):
-        #         creature.x = index[0]
-        #         creature.y = index[1]
-        #         creature.z = index[2]
-        #         world.creatures.append(creature)
-        #         if isinstance(creature, Fish):
-        #             world.number_fishes += 1
-        #         else:
-        #             world.number_sharks += 1
-
-    def save_game(self, generation, world, gathered_cubes):
-        DebugLogger.info('Thread for generation: {} started'.format(generation))
-        worlds_cubes = []
-        for index, gathered_cube in enumerate(gathered_cubes[1:], start=1):
-            if index == 1:
-                gathered_cube = numpy.delete(gathered_cube, self.world_width // (size - 1), axis=1)
-            elif index == (size - 1):
-                gathered_cube = numpy.delete(gathered_cube, 0, axis=1)
-            else:
-                gathered_cube = numpy.delete(gathered_cube, 0, axis=1)
-                gathered_cube = numpy.delete(gathered_cube, self.world_width // (size - 1), axis=1)
-            worlds_cubes.append(gathered_cube)
-        cube = numpy.concatenate(worlds_cubes, axis=1)
-        world.cube = cube
-
-        # Start reset world creatures for rank 0
-        world.creatures = []
-        world.number_fishes = 0
-        world.number_sharks = 0
-        for index, creature in numpy.ndenumerate(cube):
-            if isinstance(creature, Fish) or isinstance(creature, Shark):
-                creature.x = index[0]
-                creature.y = index[1]
-                creature.z = index[2]
-                world.creatures.append(creature)
-                if isinstance(creature, Fish):
-                    world.number_fishes += 1
-                else:
-                    world.number_sharks += 1
-        # End reset world creatures for rank 0
-        DebugLogger.debug(
-            'Generation {}/{}: Fishes: {}, Sharks: {}'.format(generation + 1, MAX_GENERATIONS, world.number_fishes,
-                                                              world.number_sharks))
-        print('Generation {}/{}: Creatures: {}'.format(generation + 1, MAX_GENERATIONS, len(world.creatures)))
-        world.save_world(DATA_DIR + '/world-{:04d}.png'.format(generation + 1))
-        DebugLogger.info('Thread for generation: {} saved the world'.format(generation + 1))
+                halo.update_ghost_borders()
+            phase_start_time = profiler.lap('halo', phase_start_time)
+            scheduler.evolve(world, halo.interior)
+            balancer.record(time.perf_counter() - phase_start_time)
+            phase_start_time = profiler.lap('evolve', phase_start_time)
+            halo.migrate()
+            phase_start_time = profiler.lap('halo', phase_start_time)
+            profiler.count('halo_bytes', halo.sent_bytes)
+            halo.sent_bytes = 0
+            profiler.creatures[step] = world.number_fishes + world.number_sharks
+            if statistics is not None:
+                statistics.collect(generation + 1, world, halo.interior, decomposition.get_block(index))
+                profiler.lap('gather', phase_start_time)
+        # The last generation is always saved, so that a finished run can be extended
+        if checkpoint is not None:
+            if generations != first_generation:
+                checkpoint.start(generations, world, halo.interior, decomposition.get_block(index),
+                                 decomposition.cuts)
+            checkpoint.close()
+        sender.close()
+        scheduler.close()
+        if collective:
+            output.close()
+        if statistics is not None:
+            statistics.close()
+        profiler.stop()
+        profiler.reduce()
+
+    def set_block(self, cart: MPI.Comm, world, decomposition: Decomposition, region, output, seed: int):
+        # Border exchange, evolution draws and snapshot output for the block the worker currently owns
+        index: int = cart.Get_rank()
+        halo = HaloExchange(cart, world, decomposition)
+        offset = tuple(start for start, _ in decomposition.get_block(index))
+        world.streams = CellStreams(seed, decomposition.shape, world.shape,
+                                    tuple(start - axis.start for start, axis in zip(offset, halo.interior)))
+        sender = SnapshotSender(comm, world, halo.interior, offset, region, SNAPSHOT_QUEUE)
+        if output is not None:
+            output.set_block(world, *get_local_region(halo.interior, offset, region))
+        # Finer timings of the border exchange and of the world, hooked again whenever the block changes
+        for target, method, name in ((halo, 'post', 'halo_post'), (halo, 'wait', 'halo_wait'),
+                                     (world, 'pack_region', 'pack'), (world, 'pack_movers', 'pack'),
+                                     (world, 'set_region', 'unpack'), (world, 'merge_region', 'merge'),
+                                     (world, 'pack_records', 'pack'), (world, 'set_records', 'unpack'),
+                                     (world, 'merge_records', 'merge'),
+                                     (world, 'get_neighbour_cells', 'neighbours'),
+                                     (world, 'get_neighbours_batch', 'neighbours')):
+            self.profiler.hook(target, method, name)
+        return halo, sender
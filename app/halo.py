@@ -0,0 +1,118 @@
+import numpy
+from mpi4py import MPI
+
+from app.decomposition import Decomposition
+from app.models.neighbourhood import Neighbourhood
+from app.models.world import World
+
+
+class HaloExchange:
+    TAG = 10
+    MIGRATION_TAG = 40
+
+    def __init__(self, comm: MPI.Comm, world: World, decomposition: Decomposition):
+        index: int = comm.Get_rank()
+        self.comm = comm
+        self.world = world
+        self.interior = decomposition.get_interior(index)
+        world.interior = self.interior
+        ghosts = decomposition.get_ghosts(index)
+        # Cells that never see a ghost cell: they can evolve while the borders are in flight
+        self.core = tuple(slice(axis.start + lower, axis.stop - upper)
+                          for axis, (lower, upper) in zip(self.interior, ghosts))
+
+        # Faces, edges and corners: one neighbour for every direction of the 26-cell neighbourhood
+        self.neighbours = list()
+        for direction, offset in enumerate(Neighbourhood.OFFSETS):
+            neighbour = decomposition.get_neighbour(index, offset)
+            if neighbour is None:
+                continue
+            boundary = tuple(self.get_layer(axis, step, axis.start, axis.stop - 1) for axis, step in
+                             zip(self.interior, offset))
+            ghost = tuple(self.get_layer(axis, step, 0, size - 1) for axis, step, size in
+                          zip(self.interior, offset, world.shape))
+            self.neighbours.append((direction, neighbour, boundary, ghost))
+        # A sparse world only sends its creatures, as many records as there are, instead of whole layers of cells
+        self.compact = getattr(world, 'SPARSE', False)
+        shapes = [() if self.compact else world.get_region_shape(boundary) for _, _, boundary, _ in self.neighbours]
+        self.send_buffers = [numpy.zeros(shape, dtype=World.CELL_DTYPE) for shape in shapes]
+        self.receive_buffers = [numpy.zeros(shape, dtype=World.CELL_DTYPE) for shape in shapes]
+        self.sent_bytes = 0
+        self.tag = self.TAG
+        self.requests = list()
+
+    @staticmethod
+    def get_layer(axis: slice, step: int, first: int, last: int) -> slice:
+        if step < 0:
+            return slice(first, first + 1)
+        if step > 0:
+            return slice(last, last + 1)
+        return axis
+
+    @staticmethod
+    def get_opposite(direction: int) -> int:
+        # Offsets are symmetric around the centre of the neighbourhood
+        return len(Neighbourhood.OFFSETS) - 1 - direction
+
+    def post(self, tag: int) -> None:
+        self.tag = tag
+        self.sent_bytes += sum(buffer.nbytes for buffer in self.send_buffers)
+        # Compact records are received once their size is known, in `wait`
+        self.requests = [] if self.compact else \
+            [self.comm.Irecv([buffer, MPI.BYTE], source=neighbour, tag=tag + self.get_opposite(direction))
+             for buffer, (direction, neighbour, _, _) in zip(self.receive_buffers, self.neighbours)]
+        self.requests += [self.comm.Isend([buffer, MPI.BYTE], dest=neighbour, tag=tag + direction)
+                          for buffer, (direction, neighbour, _, _) in zip(self.send_buffers, self.neighbours)]
+
+    def receive(self, neighbour: int, tag: int):
+        # Records come in whatever number the neighbour sent, the message is sized before it is received
+        status = MPI.Status()
+        self.comm.Probe(source=neighbour, tag=tag, status=status)
+        records = numpy.empty(status.Get_count(MPI.BYTE) // self.world.RECORD_DTYPE.itemsize,
+                              dtype=self.world.RECORD_DTYPE)
+        self.comm.Recv([records, MPI.BYTE], source=neighbour, tag=tag)
+        return records
+
+    def migrate(self) -> None:
+        # Creatures that moved into a ghost cell are handed to the neighbour owning it, the copies there are dropped
+        for position, (_, _, _, ghost) in enumerate(self.neighbours):
+            if self.compact:
+                self.send_buffers[position] = self.world.pack_records(ghost, movers=True)
+            else:
+                self.world.pack_movers(ghost, self.send_buffers[position])
+            self.world.clear_region(ghost)
+        self.post(self.MIGRATION_TAG)
+        self.wait()
+        for buffer, (_, _, boundary, _) in zip(self.receive_buffers, self.neighbours):
+            if self.compact:
+                self.world.merge_records(boundary, buffer)
+            else:
+                self.world.merge_region(boundary, buffer)
+
+    def start(self) -> None:
+        # Ghost cells become copies of the cells they mirror; the boundary is packed before any creature moves
+        for position, (_, _, boundary, _) in enumerate(self.neighbours):
+            if self.compact:
+                self.send_buffers[position] = self.world.pack_records(boundary)
+            else:
+                self.world.pack_region(boundary, self.send_buffers[position])
+        self.post(self.TAG)
+
+    def wait(self) -> None:
+        if self.compact:
+            self.receive_buffers = [self.receive(neighbour, self.tag + self.get_opposite(direction))
+                                    for direction, neighbour, _, _ in self.neighbours]
+        MPI.Request.Waitall(self.requests)
+        self.requests = list()
+
+    def finish(self) -> None:
+        self.wait()
+        for buffer, (_, _, _, ghost) in zip(self.receive_buffers, self.neighbours):
+            if self.compact:
+                self.world.set_records(ghost, buffer)
+            else:
+                self.world.set_region(ghost, buffer)
+
+    def update_ghost_borders(self) -> None:
+        self.start()
+        self.finish()
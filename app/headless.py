@@ -0,0 +1,39 @@
+import numpy
+
+from app.engines import select_engine
+from app.models.ensemble_world import EnsembleWorld
+from setup import SPARSE_DENSITY
+
+
+def check_population(length: int, width: int, height: int, fish_number: int, sharks_number: int):
+    # Creatures are placed in distinct cells
+    if fish_number + sharks_number > length * width * height:
+        raise ValueError('{} fishes and {} sharks do not fit in a {}x{}x{} world of {} cells.'.format(
+            fish_number, sharks_number, length, width, height, length * width * height))
+
+
+def play(length: int, width: int, height: int, fish_number: int, sharks_number: int, generations: int,
+         engine: str = 'object', periodic: bool = False, seed: int = None, species=None):
+    if species is None:
+        check_population(length, width, height, fish_number, sharks_number)
+    density = numpy.count_nonzero(species) / species.size if species is not None else \
+        (fish_number + sharks_number) / (length * width * height)
+    world = select_engine(engine, density, SPARSE_DENSITY)(length, width, height, periodic, seed)
+    if species is not None:
+        world.populate_from_species(species)
+    else:
+        world.populate_world(fish_number, sharks_number)
+    return world.run(generations)
+
+
+def play_ensemble(length: int, width: int, height: int, fish_number: int, sharks_number: int, generations: int,
+                  periodic: bool = False, seeds=(None,), species=None):
+    # One replicate per seed, all in one array; the populations have a row per replicate
+    if species is None:
+        check_population(length, width, height, fish_number, sharks_number)
+    world = EnsembleWorld(length, width, height, periodic, seeds)
+    if species is not None:
+        world.populate_from_species(species)
+    else:
+        world.populate_world(fish_number, sharks_number)
+    return world.run(generations)
@@ -1,14 +1,55 @@
+from app.models.creature_store import CreatureStore
+
+# Fields a creature works on as plain attributes while it evolves, the store holding them in between
+FIELDS = ('x', 'y', 'z', 'fertility', 'energy')
+
+
 class Creature:
+    __slots__ = ('store', 'slot', 'serial') + FIELDS
     ALIVE = True
     DEAD = False
+    SPECIES: int = 0
+    ENERGY: int = 0
 
-    def __init__(self, x: int, y: int, z: int):
-        self.x = x
-        self.y = y
-        self.z = z
+    def __init__(self, x: int, y: int, z: int, store: CreatureStore = None):
+        self.store = store if store is not None else CreatureStore(1)
+        self.slot = self.store.spawn(self.SPECIES, x, y, z, self.ENERGY)
+        self.serial = self.store.serial[self.slot]
+        self.x, self.y, self.z = x, y, z
         self.fertility = 0
-        self.energy = 0
-        self.state = self.ALIVE
+        self.energy = self.ENERGY
+
+    @classmethod
+    def views(cls, store: CreatureStore, slots) -> list:
+        # Creatures of the given slots, their fields read from the store all at once
+        creatures = list()
+        for slot, serial, *fields in zip(slots.tolist(), store.serial[slots].tolist(),
+                                         *(getattr(store, name)[slots].tolist() for name in FIELDS)):
+            creature = cls.__new__(cls)
+            creature.store = store
+            creature.slot = slot
+            creature.serial = serial
+            creature.x, creature.y, creature.z, creature.fertility, creature.energy = fields
+            creatures.append(creature)
+        return creatures
+
+    @property
+    def acted(self) -> bool:
+        return bool(self.store.acted[self.slot])
+
+    @acted.setter
+    def acted(self, acted: bool):
+        self.store.acted[self.slot] = acted
+
+    @property
+    def state(self) -> bool:
+        # A freed slot may already hold a newer creature, the serial tells them apart
+        return bool(self.store.alive[self.slot] and self.store.serial[self.slot] == self.serial)
+
+    @state.setter
+    def state(self, state: bool):
+        if state is self.DEAD and self.state is self.ALIVE:
+            self.store.kill(self.slot)
 
     def is_alive(self) -> bool:
         return self.state is self.ALIVE
@@ -0,0 +1,103 @@
+from operator import attrgetter
+import numpy
+
+
+class CreatureStore:
+    def __init__(self, capacity: int = 1024):
+        self.capacity = 0
+        self.x = numpy.zeros(0, dtype=numpy.int32)
+        self.y = numpy.zeros(0, dtype=numpy.int32)
+        self.z = numpy.zeros(0, dtype=numpy.int32)
+        self.species = numpy.zeros(0, dtype=numpy.uint8)
+        self.energy = numpy.zeros(0, dtype=numpy.int16)
+        self.fertility = numpy.zeros(0, dtype=numpy.int16)
+        self.alive = numpy.zeros(0, dtype=bool)
+        self.acted = numpy.zeros(0, dtype=bool)
+        self.serial = numpy.zeros(0, dtype=numpy.int64)
+        self.free = numpy.zeros(0, dtype=numpy.intp)
+        self.number_free = 0
+        # Living creatures of every species, kept up to date instead of counted again
+        self.counts = numpy.zeros(3, dtype=numpy.int64)
+        self.grow(max(capacity, 1))
+
+    def grow(self, capacity: int):
+        for name in ('x', 'y', 'z', 'species', 'energy', 'fertility', 'alive', 'acted', 'serial'):
+            array = getattr(self, name)
+            grown = numpy.zeros(capacity, dtype=array.dtype)
+            grown[:self.capacity] = array
+            setattr(self, name, grown)
+        # The free-list is a stack: new slots are pushed so that the lowest ones are handed out first
+        free = numpy.zeros(capacity, dtype=numpy.intp)
+        free[:self.number_free] = self.free[:self.number_free]
+        new_slots = numpy.arange(capacity - 1, self.capacity - 1, -1)
+        free[self.number_free:self.number_free + new_slots.size] = new_slots
+        self.free = free
+        self.number_free += new_slots.size
+        self.capacity = capacity
+
+    def spawn(self, species: int, x: int, y: int, z: int, energy: int, fertility: int = 0) -> int:
+        if self.number_free == 0:
+            self.grow(2 * self.capacity)
+        self.number_free -= 1
+        slot = int(self.free[self.number_free])
+        self.x[slot], self.y[slot], self.z[slot] = x, y, z
+        self.species[slot] = species
+        self.energy[slot] = energy
+        self.fertility[slot] = fertility
+        self.alive[slot] = True
+        self.acted[slot] = False
+        self.serial[slot] += 1
+        self.counts[species] += 1
+        return slot
+
+    def spawn_many(self, species: int, x, y, z, energy, fertility=0):
+        # Slots are taken from the free-list in the same order as one spawn after the other would take them
+        number = len(x)
+        while self.number_free < number:
+            self.grow(2 * self.capacity)
+        slots = self.free[self.number_free - number:self.number_free][::-1].copy()
+        self.number_free -= number
+        self.x[slots], self.y[slots], self.z[slots] = x, y, z
+        self.species[slots] = species
+        self.energy[slots] = energy
+        self.fertility[slots] = fertility
+        self.alive[slots] = True
+        self.acted[slots] = False
+        self.serial[slots] += 1
+        self.counts[species] += number
+        return slots
+
+    def kill(self, slot: int):
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.free[self.number_free] = slot
+        self.number_free += 1
+        self.counts[self.species[slot]] -= 1
+
+    def kill_many(self, slots):
+        # Freed in the same order as one kill after the other would free them
+        slots = numpy.asarray(slots)
+        slots = slots[self.alive[slots]]
+        self.alive[slots] = False
+        self.free[self.number_free:self.number_free + slots.size] = slots
+        self.number_free += slots.size
+        numpy.subtract.at(self.counts, self.species[slots], 1)
+
+    def save(self, creatures: list, fields: tuple):
+        # Creatures evolve on attributes of their own, the ones still living write them back here
+        slots = numpy.array([creature.slot for creature in creatures], dtype=numpy.intp)
+        serials = numpy.array([creature.serial for creature in creatures], dtype=numpy.int64)
+        living = self.alive[slots] & (self.serial[slots] == serials)
+        values = numpy.array(list(map(attrgetter(*fields), creatures)), dtype=numpy.int64).reshape(-1, len(fields))
+        for name, column in zip(fields, values[living].T):
+            getattr(self, name)[slots[living]] = column
+
+    def get_slots(self):
+        return numpy.flatnonzero(self.alive)
+
+    def count(self, species: int) -> int:
+        return int(self.counts[species])
+
+    def __len__(self):
+        return self.capacity - self.number_free
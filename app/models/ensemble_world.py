@@ -0,0 +1,84 @@
+from app.models.neighbourhood import Neighbourhood, get_cells_batch, get_neighbourhood
+from app.models.streams import ReplicateStreams, get_seed_sequence
+from app.models.vectorized_world import VectorizedWorld
+import numpy
+
+
+class EnsembleWorld(VectorizedWorld):
+    # Independent replicates of one world stacked along the first axis and advanced by the same generation steps.
+    # Creatures only see the cells of their own replicate, and every replicate draws from its own seed, so each one
+    # evolves exactly as a vectorized world of that seed would on its own.
+
+    # Replicates evolve a few at a time, so that the batches of creatures and draws stay in cache
+    CHUNK_CELLS = 1 << 15
+
+    def __init__(self, length: int, width: int, height: int, periodic=False, seeds=(None,)):
+        self.replicates = len(seeds)
+        self.replicate_shape = (length, width, height)
+        super().__init__(self.replicates * length, width, height, periodic, seeds[0])
+        self.replicate_cells = length * width * height
+        self.randoms = [numpy.random.default_rng(get_seed_sequence(seed)) for seed in seeds]
+        self.streams = ReplicateStreams(seeds, self.replicate_shape)
+
+    @property
+    def neighbourhood(self) -> Neighbourhood:
+        return get_neighbourhood(self.replicate_shape, self.periodic)
+
+    def get_neighbours_batch(self, cells):
+        # Neighbours are looked up within the replicate, then moved to its place in the stack
+        local = cells % self.replicate_cells
+        neighbours = self.neighbourhood.cells[local] + (cells - local)[:, None]
+        return neighbours, self.cube.reshape(-1)[neighbours]
+
+    def get_reach_batch(self, cells):
+        local = cells % self.replicate_cells
+        return get_cells_batch(self.replicate_shape, self.periodic, local, 2) + (cells - local)[:, None]
+
+    def evolve_world(self):
+        self.start_generation()
+        length = self.replicate_shape[0]
+        chunk = max(1, self.CHUNK_CELLS // self.replicate_cells)
+        for first in range(0, self.replicates, chunk):
+            self.add_events(*self.evolve_block((slice(first * length, (first + chunk) * length), slice(None),
+                                                slice(None))))
+        self.refresh_creatures()
+
+    def get_replicate_grids(self):
+        return self.cube.reshape((self.replicates,) + self.replicate_shape)
+
+    def populate_world(self, number_fishes, number_sharks, region: tuple = (slice(None),) * 3):
+        # Every replicate places its creatures with its own stream, drawing as a world of its own would
+        for replicate, random in enumerate(self.randoms):
+            occupied = self.get_replicate_grids()[replicate][region] != self.EMPTY_CELL
+            shape = occupied.shape
+            if occupied.any():
+                chosen = random.choice(numpy.flatnonzero(~occupied), number_fishes + number_sharks, replace=False)
+            else:
+                chosen = random.choice(occupied.size, number_fishes + number_sharks, replace=False)
+            bounds = [axis.indices(size)[:2] for axis, size in zip(region, self.replicate_shape)]
+            positions = numpy.unravel_index(chosen, shape)
+            cells = numpy.ravel_multi_index(tuple(position + start for position, (start, _) in
+                                                  zip(positions, bounds)), self.replicate_shape)
+            cells += replicate * self.replicate_cells
+            self.place_creatures(cells[:number_fishes], self.FISH_CELL)
+            self.place_creatures(cells[number_fishes:], self.SHARK_CELL)
+        self.refresh_creatures()
+
+    def populate_from_species(self, species, region: tuple = (slice(None),) * 3):
+        # One snapshot starts every replicate
+        super().populate_from_species(numpy.tile(species, (self.replicates, 1, 1)), region)
+
+    def get_populations(self) -> tuple:
+        grids = self.cube.reshape(self.replicates, -1)
+        return numpy.count_nonzero(grids == self.FISH_CELL, axis=1), numpy.count_nonzero(grids == self.SHARK_CELL,
+                                                                                         axis=1)
+
+    def run(self, generations: int):
+        # Population of every replicate in every generation, the initial one included
+        fishes = numpy.zeros((self.replicates, generations + 1), dtype=numpy.int64)
+        sharks = numpy.zeros((self.replicates, generations + 1), dtype=numpy.int64)
+        fishes[:, 0], sharks[:, 0] = self.get_populations()
+        for generation in range(1, generations + 1):
+            self.evolve_world()
+            fishes[:, generation], sharks[:, generation] = self.get_populations()
+        return fishes, sharks
@@ -0,0 +1,76 @@
+from functools import lru_cache
+import numpy
+
+
+class Neighbourhood:
+    OFFSETS = numpy.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+                           if (dx, dy, dz) != (0, 0, 0)], dtype=numpy.intp)
+
+    def __init__(self, shape: tuple, periodic: tuple = (False, False, False)):
+        self.shape = shape
+        self.periodic = periodic
+        self.cells = self.init_cells(self)
+
+    def get_cells(self, grid, cell: int, value: int):
+        neighbours = self.cells[cell]
+        return neighbours[grid[neighbours] == value]
+
+    def get_cells_batch(self, grid, cells):
+        neighbours = self.cells[cells]
+        return neighbours, grid[neighbours]
+
+    @staticmethod
+    def init_cells(self):
+        # Every row holds the flat indices of the 26 neighbours of a cell, ghost columns included. Periodic axes wrap
+        # around; neighbours outside the grid along the other axes point back to the cell itself: it is never empty
+        # nor prey for the creature asking, so no bounds mask is needed on lookup.
+        number_cells = int(numpy.prod(self.shape))
+        dtype = numpy.int32 if number_cells < numpy.iinfo(numpy.int32).max else numpy.int64
+        positions = numpy.indices(self.shape).reshape(3, -1).T
+        cells = numpy.empty((number_cells, len(self.OFFSETS)), dtype=dtype)
+        periodic = numpy.array(self.periodic)
+        for index, offset in enumerate(self.OFFSETS):
+            neighbours = positions + offset
+            neighbours[:, periodic] %= numpy.array(self.shape)[periodic]
+            valid = ((neighbours >= 0) & (neighbours < self.shape)).all(axis=1)
+            flat = numpy.ravel_multi_index(tuple(numpy.where(valid, neighbours.T, positions.T)), self.shape)
+            cells[:, index] = flat
+        return cells
+
+
+# Only the table of the current block is kept: a table takes 26 indices a cell, and every rebalancing or conversion
+# brings a new block shape that would otherwise leave the old tables resident
+@lru_cache(maxsize=1)
+def get_neighbourhood(shape: tuple, periodic: tuple = (False, False, False)) -> Neighbourhood:
+    return Neighbourhood(shape, periodic)
+
+
+def get_cells_batch(shape: tuple, periodic: tuple, cells, radius: int = 1):
+    # The same rows as Neighbourhood.cells, worked out from the cells instead of read from a table over the whole grid.
+    # With a larger `radius` the rows hold every cell up to that many steps away along each axis. Cells that far from
+    # every border only add fixed offsets, the others sum the steps along every axis over all their combinations
+    cells = numpy.asarray(cells, dtype=numpy.intp)
+    width = 2 * radius + 1
+    strides = numpy.cumprod((1,) + tuple(shape[:0:-1]))[::-1]
+    offsets = numpy.delete(sum(numpy.arange(-radius, radius + 1).reshape((1,) * axis + (width,) + (1,) * (2 - axis)) *
+                               stride for axis, stride in enumerate(strides)).reshape(-1), width ** 3 // 2)
+    positions = numpy.unravel_index(cells, shape)
+    inside = numpy.ones(cells.size, dtype=bool)
+    for position, size in zip(positions, shape):
+        inside &= (position >= radius) & (position < size - radius)
+    neighbours = cells[:, None] + offsets
+    if inside.all():
+        return neighbours
+    border = numpy.flatnonzero(~inside)
+    terms, valid = list(), numpy.ones((border.size,) + (1,) * 3, dtype=bool)
+    for axis, (position, size, wrapped, stride) in enumerate(zip(positions, shape, periodic, strides)):
+        steps = position[border, None] + numpy.arange(-radius, radius + 1)
+        if wrapped:
+            steps %= size
+        else:
+            valid = valid & ((steps >= 0) & (steps < size)).reshape((-1,) + (1,) * axis + (width,) + (1,) * (2 - axis))
+        terms.append((steps * stride).reshape((-1,) + (1,) * axis + (width,) + (1,) * (2 - axis)))
+    around = (terms[0] + terms[1] + terms[2]).reshape(-1, width ** 3)
+    valid = numpy.broadcast_to(valid, (border.size,) + (width,) * 3).reshape(-1, width ** 3)
+    neighbours[border] = numpy.delete(numpy.where(valid, around, cells[border, None]), width ** 3 // 2, axis=1)
+    return neighbours
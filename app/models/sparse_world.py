@@ -0,0 +1,220 @@
+from app.models.neighbourhood import get_cells_batch
+from app.models.vectorized_world import VectorizedWorld
+from app.models.world import World
+import numpy
+
+
+class SparseWorld(VectorizedWorld):
+    # Creatures are records sorted by flat cell, so memory and work follow the creatures rather than the volume
+    SPARSE = True
+    RECORD_DTYPE = numpy.dtype([('cell', numpy.int64), ('species', numpy.uint8), ('energy', numpy.int16),
+                                ('fertility', numpy.int16)])
+
+    def __init__(self, length: int, width: int, height: int, periodic=False, seed=None):
+        self.init_state(length, width, height, periodic, seed)
+        self.records = numpy.zeros(0, dtype=self.RECORD_DTYPE)
+        self.acted = numpy.zeros(0, dtype=bool)
+
+    @property
+    def shape(self) -> tuple:
+        return self.length, self.width, self.height
+
+    @property
+    def cube(self):
+        return self.get_species_grid()
+
+    def find(self, cells):
+        # Where the cells are, or would go, in the records, and whether a creature lives there
+        index = numpy.searchsorted(self.records['cell'], cells)
+        if self.records.size == 0:
+            return index, numpy.zeros(numpy.shape(cells), dtype=bool)
+        index = numpy.minimum(index, self.records.size - 1)
+        return index, self.records['cell'][index] == cells
+
+    def get_species_at(self, cells):
+        index, found = self.find(cells)
+        if self.records.size == 0:
+            return numpy.zeros(numpy.shape(cells), dtype=numpy.uint8)
+        return numpy.where(found, self.records['species'][index], self.EMPTY_CELL).astype(numpy.uint8)
+
+    def write(self, records, acted):
+        # The creatures of the given cells are replaced, empty records clearing them, in one sorted merge
+        keep = ~numpy.isin(self.records['cell'], records['cell'])
+        occupied = records['species'] != self.EMPTY_CELL
+        merged = numpy.concatenate((self.records[keep], records[occupied]))
+        merged_acted = numpy.concatenate((self.acted[keep], acted[occupied]))
+        order = numpy.argsort(merged['cell'], kind='stable')
+        self.records, self.acted = merged[order], merged_acted[order]
+
+    def get_neighbours_batch(self, cells):
+        neighbours = get_cells_batch(self.shape, self.periodic, cells)
+        return neighbours, self.get_species_at(neighbours)
+
+    def get_species_grid(self):
+        grid = numpy.zeros(self.shape, dtype=numpy.uint8)
+        grid.reshape(-1)[self.records['cell']] = self.records['species']
+        return grid
+
+    def spawn_fish(self, x: int, y: int, z: int):
+        self.place_creatures(numpy.ravel_multi_index(([x], [y], [z]), self.shape), self.FISH_CELL)
+
+    def spawn_shark(self, x: int, y: int, z: int):
+        self.place_creatures(numpy.ravel_multi_index(([x], [y], [z]), self.shape), self.SHARK_CELL)
+
+    def place_creatures(self, cells, species: int, energy=None, fertility=0):
+        records = numpy.zeros(len(cells), dtype=self.RECORD_DTYPE)
+        records['cell'] = cells
+        records['species'] = species
+        records['energy'] = self.CREATURES[species].ENERGY if energy is None else energy
+        records['fertility'] = fertility
+        self.write(records, numpy.zeros(len(cells), dtype=bool))
+
+    def evolve_world(self):
+        self.start_generation()
+        self.evolve_region((slice(None),) * 3)
+
+    def start_generation(self):
+        self.generation += 1
+        self.acted[:] = False
+
+    def evolve_region(self, region: tuple):
+        selected, starving = self.start_turns(numpy.flatnonzero(self.get_region_mask(region)), self.acted,
+                                              self.records['fertility'], self.records['energy'])
+        self.add_events(*self.evolve_creatures(self.records['cell'][selected], starving))
+        self.refresh_creatures()
+
+    def find_creatures(self, cells, lookup):
+        # Where the cells looked up are in `cells`, or past its end
+        sorter = numpy.argsort(cells)
+        index = sorter[numpy.minimum(numpy.searchsorted(cells, lookup, sorter=sorter), cells.size - 1)]
+        return numpy.where(cells[index] == lookup, index, cells.size)
+
+    def remove_creatures(self, cells) -> int:
+        records = numpy.zeros(cells.size, dtype=self.RECORD_DTYPE)
+        records['cell'] = cells
+        self.write(records, numpy.zeros(cells.size, dtype=bool))
+        return cells.size
+
+    def apply_moves(self, sources, targets) -> tuple:
+        moved = self.records[self.find(sources)[0]]
+        species = moved['species']
+        eaten = self.get_species_at(targets) == self.FISH_CELL
+        index, found = self.find(targets)
+        predations = self.count_predations(eaten, targets, found & self.acted[index] if self.acted.size else found)
+        breeding = moved['fertility'] >= self.FERTILITY_THRESHOLDS[species]
+        left = numpy.zeros(sources.size, dtype=self.RECORD_DTYPE)
+        left['cell'] = sources
+        left['species'] = numpy.where(breeding, species, self.EMPTY_CELL)
+        left['energy'] = numpy.where(breeding, self.ENERGIES[species], 0)
+        moved['cell'] = targets
+        moved['energy'] += eaten
+        moved['fertility'] = numpy.where(breeding, 0, moved['fertility'])
+        self.write(numpy.concatenate((moved, left)), numpy.concatenate((numpy.ones(targets.size, dtype=bool),
+                                                                         breeding)))
+        return int(numpy.count_nonzero(breeding)), predations
+
+    def get_region_mask(self, region: tuple):
+        # Which creatures stand in the region
+        return self.get_inside_mask(self.records['cell'], region)
+
+    def to_region(self, cells, region: tuple):
+        # Flat indices in the world become flat indices in the region, and back
+        starts = [axis.indices(size)[0] for axis, size in zip(region, self.shape)]
+        positions = numpy.unravel_index(cells, self.shape)
+        return numpy.ravel_multi_index(tuple(position - start for position, start in zip(positions, starts)),
+                                       self.get_region_shape(region))
+
+    def from_region(self, cells, region: tuple):
+        starts = [axis.indices(size)[0] for axis, size in zip(region, self.shape)]
+        positions = numpy.unravel_index(cells, self.get_region_shape(region))
+        return numpy.ravel_multi_index(tuple(position + start for position, start in zip(positions, starts)),
+                                       self.shape)
+
+    def get_species_region(self, region: tuple):
+        grid = numpy.zeros(self.get_region_shape(region), dtype=numpy.uint8)
+        records = self.pack_records(region)
+        grid.reshape(-1)[records['cell']] = records['species']
+        return grid
+
+    def get_region_creatures(self, region: tuple):
+        inside = self.get_region_mask(region)
+        records = self.records[inside]
+        starts = [axis.indices(size)[0] for axis, size in zip(region, self.shape)]
+        positions = tuple(position - start for position, start in
+                          zip(numpy.unravel_index(records['cell'], self.shape), starts))
+        return positions, records['species'], records['energy']
+
+    def pack_records(self, region: tuple, movers: bool = False):
+        # The creatures of the region, by flat index in the region; only the ones that moved in, with `movers`
+        inside = self.get_region_mask(region)
+        if movers:
+            inside &= self.acted
+        records = self.records[inside]
+        records['cell'] = self.to_region(records['cell'], region)
+        return records
+
+    def clear_region(self, region: tuple):
+        inside = self.get_region_mask(region)
+        species = self.records['species'][inside]
+        self.add_creatures(-int(numpy.count_nonzero(species == self.FISH_CELL)),
+                           -int(numpy.count_nonzero(species == self.SHARK_CELL)))
+        self.records, self.acted = self.records[~inside], self.acted[~inside]
+
+    def set_records(self, region: tuple, records):
+        self.clear_region(region)
+        records = records.copy()
+        records['cell'] = self.from_region(records['cell'], region)
+        self.write(records, numpy.zeros(records.size, dtype=bool))
+        self.add_creatures(int(numpy.count_nonzero(records['species'] == self.FISH_CELL)),
+                           int(numpy.count_nonzero(records['species'] == self.SHARK_CELL)))
+
+    def merge_records(self, region: tuple, records):
+        cells = self.from_region(records['cell'], region)
+        species = records['species']
+        arriving, eaten, displaced = self.get_merge_masks(self.get_species_at(cells), species)
+        arrived = records[arriving].copy()
+        arrived['cell'] = cells[arriving]
+        self.write(arrived, numpy.zeros(arrived.size, dtype=bool))
+
+        targets = self.get_settling_cells(cells[displaced])
+        settled = targets >= 0
+        settling = records[displaced][settled].copy()
+        settling['cell'] = targets[settled]
+        self.write(settling, numpy.zeros(settling.size, dtype=bool))
+        self.add_creatures(int(numpy.count_nonzero(arrived['species'] == self.FISH_CELL)) -
+                           int(numpy.count_nonzero(eaten)) + settling.size,
+                           int(numpy.count_nonzero(arrived['species'] == self.SHARK_CELL)))
+        self.count_merge_events(species, arriving, eaten, displaced, settled)
+
+    def get_records(self, data):
+        # The occupied cells of a dense buffer as records
+        flat = data.reshape(-1)
+        cells = numpy.flatnonzero(flat['species'])
+        records = numpy.zeros(cells.size, dtype=self.RECORD_DTYPE)
+        records['cell'] = cells
+        for name in World.CELL_DTYPE.names:
+            records[name] = flat[name][cells]
+        return records
+
+    @staticmethod
+    def fill(data, records):
+        data[...] = 0
+        flat = data.reshape(-1)
+        for name in World.CELL_DTYPE.names:
+            flat[name][records['cell']] = records[name]
+
+    def pack_region(self, region: tuple, data):
+        self.fill(data, self.pack_records(region))
+
+    def pack_movers(self, region: tuple, data):
+        self.fill(data, self.pack_records(region, movers=True))
+
+    def set_region(self, region: tuple, data):
+        self.set_records(region, self.get_records(data))
+
+    def merge_region(self, region: tuple, data):
+        self.merge_records(region, self.get_records(data))
+
+    def refresh_creatures(self):
+        self.number_fishes = int(numpy.count_nonzero(self.records['species'] == self.FISH_CELL))
+        self.number_sharks = int(numpy.count_nonzero(self.records['species'] == self.SHARK_CELL))
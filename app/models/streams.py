@@ -0,0 +1,61 @@
+import numpy
+
+STEP = numpy.uint64(0x9E3779B97F4A7C15)
+NUMBER_STREAMS = 4
+
+
+def get_seed(seed: int = None) -> int:
+    # A missing seed is drawn from the OS once, so that it can be recorded and the run repeated
+    if seed is not None:
+        return seed
+    return int(numpy.random.SeedSequence().generate_state(1, numpy.uint64)[0] >> numpy.uint64(1))
+
+
+def get_seed_sequence(seed) -> numpy.random.SeedSequence:
+    return seed if isinstance(seed, numpy.random.SeedSequence) else numpy.random.SeedSequence(seed)
+
+
+def mix(values):
+    # SplitMix64 finaliser: every bit of a counter spreads over the whole 64-bit output
+    values = values ^ (values >> numpy.uint64(30))
+    values = values * numpy.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> numpy.uint64(27))
+    values = values * numpy.uint64(0x94D049BB133111EB)
+    return values ^ (values >> numpy.uint64(31))
+
+
+class CellStreams:
+    def __init__(self, seed, shape: tuple, local_shape: tuple = None, origin: tuple = (0, 0, 0)):
+        # Draws are keyed by the global cell, not by the worker holding it, so they do not change with the blocks
+        self.key = get_seed_sequence(seed).generate_state(1, numpy.uint64)[0]
+        self.shape = tuple(shape)
+        self.local_shape = tuple(local_shape or shape)
+        self.origin = tuple(origin)
+        self.number_cells = int(numpy.prod(self.shape))
+
+    def get_keys(self, generation: int, cells, stream: int = 0):
+        positions = numpy.unravel_index(cells, self.local_shape)
+        global_cells = numpy.ravel_multi_index(tuple(position + offset for position, offset in
+                                                     zip(positions, self.origin)), self.shape, mode='wrap')
+        counters = numpy.uint64((generation * NUMBER_STREAMS + stream) * self.number_cells) + \
+            global_cells.astype(numpy.uint64)
+        return mix(self.key ^ mix(counters))
+
+    def get_uniforms(self, generation: int, cells, count: int, stream: int = 0):
+        # `count` uniform numbers in [0, 1) for every local cell, all in one batch
+        keys = self.get_keys(generation, cells, stream)
+        values = mix(keys[:, None] + STEP * numpy.arange(1, count + 1, dtype=numpy.uint64))
+        return (values >> numpy.uint64(11)) * (1.0 / (1 << 53))
+
+
+class ReplicateStreams(CellStreams):
+    def __init__(self, seeds, shape: tuple):
+        # Replicates of a `shape` world stacked along the first axis, each drawing what a world of its own seed would
+        super().__init__(None, shape)
+        self.keys = numpy.array([get_seed_sequence(seed).generate_state(1, numpy.uint64)[0] for seed in seeds])
+
+    def get_keys(self, generation: int, cells, stream: int = 0):
+        replicates, cells = numpy.divmod(cells, self.number_cells)
+        counters = numpy.uint64((generation * NUMBER_STREAMS + stream) * self.number_cells) + \
+            cells.astype(numpy.uint64)
+        return mix(self.keys[replicates] ^ mix(counters))
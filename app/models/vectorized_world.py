@@ -0,0 +1,245 @@
+from app.models.fish import Fish
+from app.models.neighbourhood import get_cells_batch
+from app.models.shark import Shark
+from app.models.world import World
+import numpy
+import threading
+
+
+class VectorizedWorld(World):
+    COLORS = numpy.array([World.WATER_COLOR, World.FISH_COLOR, World.SHARK_COLOR], dtype=object)
+    # Breeding age and newborn energy by species code
+    FERTILITY_THRESHOLDS = numpy.array([0, Fish.FERTILITY_THRESHOLD, Shark.FERTILITY_THRESHOLD])
+    ENERGIES = numpy.array([0, Fish.ENERGY, Shark.ENERGY], dtype=numpy.int16)
+    # Creatures whose neighbours within two cells are looked up at once
+    CHUNK_CREATURES = 1 << 14
+
+    def __init__(self, length: int, width: int, height: int, periodic=False, seed=None):
+        self.init_state(length, width, height, periodic, seed)
+        self.cube = self.init_empty_cube(self)
+        self.energy = numpy.zeros(self.cube.shape, dtype=numpy.int16)
+        self.fertility = numpy.zeros(self.cube.shape, dtype=numpy.int16)
+        self.acted = numpy.zeros(self.cube.shape, dtype=bool)
+        self.scratch = threading.local()
+
+    def spawn_fish(self, x: int, y: int, z: int):
+        self.cube[x, y, z] = self.FISH_CELL
+        self.energy[x, y, z] = Fish.ENERGY
+        self.fertility[x, y, z] = 0
+
+    def spawn_shark(self, x: int, y: int, z: int):
+        self.cube[x, y, z] = self.SHARK_CELL
+        self.energy[x, y, z] = Shark.ENERGY
+        self.fertility[x, y, z] = 0
+
+    def place_creatures(self, cells, species: int, energy=None, fertility=0):
+        self.cube.reshape(-1)[cells] = species
+        self.energy.reshape(-1)[cells] = self.CREATURES[species].ENERGY if energy is None else energy
+        self.fertility.reshape(-1)[cells] = fertility
+        self.acted.reshape(-1)[cells] = False
+
+    def get_world_cube_image(self):
+        grid = self.get_species_grid()
+        return self.COLORS[grid], grid.astype(int)
+
+    def evolve_world(self):
+        self.start_generation()
+        self.evolve_region((slice(None),) * 3)
+
+    def start_generation(self):
+        self.generation += 1
+        self.acted[:] = False
+
+    def evolve_region(self, region: tuple):
+        self.add_events(*self.evolve_block(region))
+        self.refresh_creatures()
+
+    def add_events(self, births: int, deaths: int, predations: int):
+        self.births += births
+        self.deaths += deaths
+        self.predations += predations
+
+    def evolve_block(self, region: tuple) -> tuple:
+        # Nothing but the region and the cells around it is read or written, so regions two cells apart can evolve at
+        # once; the births, deaths and predations are returned rather than counted here
+        cube = self.cube.reshape(-1)
+        energy = self.energy.reshape(-1)
+        fertility = self.fertility.reshape(-1)
+        acted = self.acted.reshape(-1)
+        cells = self.get_region_cells(region).reshape(-1)
+        return self.evolve_creatures(*self.start_turns(cells[cube[cells] != self.EMPTY_CELL], acted, fertility, energy))
+
+    def get_species_at(self, cells):
+        return self.cube.reshape(-1)[cells]
+
+    def get_reach_batch(self, cells):
+        # Every cell up to two steps away: what a creature there reads or writes can meet what one here does
+        return get_cells_batch(self.shape, self.periodic, cells, 2)
+
+    def evolve_creatures(self, cells, starving) -> tuple:
+        # The creatures act one after the other in a shuffled order, with the draws and the rules of World, starving
+        # ones dying on their turn. What a creature reads and writes lies within a cell of where it starts, so only
+        # creatures up to two cells apart depend on which of them acts first: every round evolves at once the creatures
+        # whose creatures ahead of them within two cells have all acted, which ends as acting one after the other does
+        draws = self.streams.get_uniforms(self.generation, cells, 2)
+        order = numpy.argsort(draws[:, 0], kind='stable')
+        cells, draws, starving = cells[order], draws[order, 1], starving[order]
+        species = self.get_species_at(cells)
+        behind, starts = self.get_dependencies(cells)
+        waiting = numpy.bincount(behind, minlength=cells.size)
+        births = deaths = predations = 0
+        ready = numpy.flatnonzero(waiting == 0)
+        while ready.size:
+            # Fishes eaten before their turn are gone
+            acting = ready[self.get_species_at(cells[ready]) == species[ready]]
+            deaths += self.remove_creatures(cells[acting[starving[acting]]])
+            acting = acting[~starving[acting]]
+            targets = self.choose_moves(cells[acting], draws[acting])
+            moving = targets >= 0
+            moved_births, moved_predations = self.apply_moves(cells[acting[moving]], targets[moving])
+            births += moved_births
+            predations += moved_predations
+            # The creatures behind them that wait for nothing else act in the next round
+            counts = starts[ready + 1] - starts[ready]
+            released = behind[numpy.repeat(starts[ready] - numpy.cumsum(counts) + counts, counts) +
+                              numpy.arange(counts.sum())]
+            released, times = numpy.unique(released, return_counts=True)
+            waiting[released] -= times
+            ready = released[waiting[released] == 0]
+        return births, deaths, predations
+
+    def get_dependencies(self, cells) -> tuple:
+        # The creatures up to two cells behind every creature in the order, as their places in `cells`, all in one
+        # array: those of creature i start at starts[i]
+        behind, counts = list(), list()
+        for start in range(0, cells.size, self.CHUNK_CREATURES):
+            rows = numpy.arange(start, min(start + self.CHUNK_CREATURES, cells.size))
+            found = self.find_creatures(cells, self.get_reach_batch(cells[rows]))
+            later = (found > rows[:, None]) & (found < cells.size)
+            behind.append(found[later])
+            counts.append(numpy.count_nonzero(later, axis=1))
+        behind = numpy.concatenate(behind) if behind else numpy.zeros(0, dtype=numpy.int32)
+        counts = numpy.concatenate(counts) if counts else numpy.zeros(0, dtype=numpy.intp)
+        return behind, numpy.concatenate(([0], numpy.cumsum(counts)))
+
+    def find_creatures(self, cells, lookup):
+        # Where the cells looked up are in `cells`, or past its end; on a grid of the world kept by every thread
+        marks = getattr(self.scratch, 'marks', None)
+        if marks is None:
+            marks = self.scratch.marks = numpy.full(self.cube.size, numpy.iinfo(numpy.int32).max, dtype=numpy.int32)
+        marks[cells] = numpy.arange(cells.size)
+        found = marks[lookup]
+        marks[cells] = numpy.iinfo(numpy.int32).max
+        return found
+
+    def choose_moves(self, cells, draws):
+        # Start choosing a destination for every creature
+        # Sharks go for the fishes around them if there are any, fishes and sharks without prey for the empty cells;
+        # the draw picks one of them in the order of the neighbourhood, as World.pick does. Creatures with nowhere to
+        # go get -1
+        neighbours, contents = self.get_neighbours_batch(cells)
+        candidates = contents == self.EMPTY_CELL
+        prey = (contents == self.FISH_CELL) & (self.get_species_at(cells) == self.SHARK_CELL)[:, None]
+        hungry = prey.any(axis=1)
+        candidates[hungry] = prey[hungry]
+        counts = numpy.count_nonzero(candidates, axis=1)
+        choices = (numpy.cumsum(candidates, axis=1) > (draws * counts).astype(numpy.intp)[:, None]).argmax(axis=1)
+        # End choosing a destination for every creature
+        return numpy.where(counts > 0, neighbours[numpy.arange(cells.size), choices], -1)
+
+    def remove_creatures(self, cells) -> int:
+        self.cube.reshape(-1)[cells] = self.EMPTY_CELL
+        self.energy.reshape(-1)[cells] = 0
+        self.fertility.reshape(-1)[cells] = 0
+        return cells.size
+
+    def apply_moves(self, sources, targets) -> tuple:
+        cube = self.cube.reshape(-1)
+        energy = self.energy.reshape(-1)
+        fertility = self.fertility.reshape(-1)
+        acted = self.acted.reshape(-1)
+
+        # Start moving and breeding
+        species = cube[sources]
+        eaten = cube[targets] == self.FISH_CELL
+        predations = self.count_predations(eaten, targets, acted[targets])
+        breeding = fertility[sources] >= self.FERTILITY_THRESHOLDS[species]
+        cube[targets] = species
+        energy[targets] = energy[sources] + eaten
+        fertility[targets] = numpy.where(breeding, 0, fertility[sources])
+        cube[sources] = numpy.where(breeding, species, self.EMPTY_CELL)
+        energy[sources] = numpy.where(breeding, self.ENERGIES[species], 0)
+        fertility[sources] = 0
+        acted[targets] = True
+        acted[sources] = breeding
+        # End moving and breeding
+        return int(numpy.count_nonzero(breeding)), predations
+
+    def get_species_grid(self):
+        return self.cube
+
+    def get_region_creatures(self, region: tuple):
+        positions = numpy.nonzero(self.cube[region])
+        return positions, self.cube[region][positions], self.energy[region][positions]
+
+    def pack_region(self, region: tuple, data):
+        data['species'] = self.cube[region]
+        data['energy'] = self.energy[region]
+        data['fertility'] = self.fertility[region]
+
+    def pack_movers(self, region: tuple, data):
+        # Only the creatures that moved into the region during this generation, not the copies living there
+        movers = self.acted[region]
+        data['species'] = numpy.where(movers, self.cube[region], self.EMPTY_CELL)
+        data['energy'] = numpy.where(movers, self.energy[region], 0)
+        data['fertility'] = numpy.where(movers, self.fertility[region], 0)
+
+    def count_region(self, region: tuple) -> tuple:
+        cube = self.cube[region]
+        return int(numpy.count_nonzero(cube == self.FISH_CELL)), int(numpy.count_nonzero(cube == self.SHARK_CELL))
+
+    def add_creatures(self, fishes: int, sharks: int):
+        # Region changes are counted on the region alone instead of the whole cube
+        self.number_fishes += fishes
+        self.number_sharks += sharks
+
+    def clear_region(self, region: tuple):
+        fishes, sharks = self.count_region(region)
+        self.add_creatures(-fishes, -sharks)
+        self.cube[region] = self.EMPTY_CELL
+        self.energy[region] = 0
+        self.fertility[region] = 0
+        self.acted[region] = False
+
+    def set_region(self, region: tuple, data):
+        self.clear_region(region)
+        self.cube[region] = data['species']
+        self.energy[region] = data['energy']
+        self.fertility[region] = data['fertility']
+        self.add_creatures(*self.count_region(region))
+
+    def refresh_creatures(self):
+        self.number_fishes = int(numpy.count_nonzero(self.cube == self.FISH_CELL))
+        self.number_sharks = int(numpy.count_nonzero(self.cube == self.SHARK_CELL))
+
+    def merge_region(self, region: tuple, data):
+        species, energy, fertility = data['species'], data['energy'], data['fertility']
+        fishes, sharks = self.count_region(region)
+        arriving, eaten, displaced = self.get_merge_masks(self.cube[region], species)
+        self.cube[region][arriving] = species[arriving]
+        self.energy[region][arriving] = energy[arriving]
+        self.fertility[region][arriving] = fertility[arriving]
+        self.acted[region][arriving] = False
+        arrived_fishes, arrived_sharks = self.count_region(region)
+        self.add_creatures(arrived_fishes - fishes, arrived_sharks - sharks)
+
+        targets = self.get_settling_cells(self.get_region_cells(region)[displaced])
+        settled = targets >= 0
+        self.place_creatures(targets[settled], self.FISH_CELL, energy[displaced][settled],
+                             fertility[displaced][settled])
+        self.add_creatures(int(numpy.count_nonzero(settled)), 0)
+        self.count_merge_events(species, arriving, eaten, displaced, settled)
+
+    @staticmethod
+    def init_empty_cube(self):
+        return numpy.zeros((self.length, self.width, self.height), dtype=numpy.uint8)
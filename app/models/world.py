@@ -1,14 +1,10 @@
-from mpi4py import MPI
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+from app.models.creature import FIELDS
+from app.models.creature_store import CreatureStore
 from app.models.fish import Fish
+from app.models.neighbourhood import Neighbourhood, get_neighbourhood
 from app.models.shark import Shark
+from app.models.streams import CellStreams, get_seed_sequence
 import numpy
-import random
-
-comm = MPI.COMM_WORLD
-size = comm.Get_size()
-rank = comm.Get_rank()
 
 
 class World:
@@ -18,66 +14,99 @@ class World:
     WATER_COLOR = '#00008b'
     SHARK_COLOR = '#ff69b4'
     FISH_COLOR = '#00cc00'
+    CREATURES = {FISH_CELL: Fish, SHARK_CELL: Shark}
+    CELL_DTYPE = numpy.dtype([('species', numpy.uint8), ('energy', numpy.int16), ('fertility', numpy.int16)])
+
+    def __init__(self, length: int, width: int, height: int, periodic=False, seed=None):
+        self.init_state(length, width, height, periodic, seed)
+        self.store = CreatureStore()
+        self.cube = self.init_empty_cube(self)
+        self.species = numpy.zeros(self.cube.shape, dtype=numpy.uint8)
 
-    def __init__(self, length: int, width: int, height: int):
+    def init_state(self, length: int, width: int, height: int, periodic=False, seed=None):
+        # What every engine keeps besides its creatures: the shape, the counters and the random streams
         self.length = length
         self.width = width
         self.height = height
-        self.creatures = list()
-        self.cube = self.init_empty_cube(self)
+        self.periodic = periodic if isinstance(periodic, tuple) else (periodic,) * 3
         self.number_cells = length * width * height
         self.number_fishes = 0
         self.number_sharks = 0
+        self.interior = (slice(None),) * 3
+        self.generation = 0
+        # Events since the statistics last read them
+        self.births = 0
+        self.deaths = 0
+        self.predations = 0
+        # Placement and border merges draw from the stream of the world, evolution from draws keyed by cell
+        self.random = numpy.random.default_rng(get_seed_sequence(seed))
+        self.streams = CellStreams(seed, (length, width, height))
+
+    @property
+    def shape(self) -> tuple:
+        return self.cube.shape
+
+    @property
+    def creatures(self) -> list:
+        slots = self.store.get_slots()
+        return self.cube[self.store.x[slots], self.store.y[slots], self.store.z[slots]].tolist()
 
     def spawn_fish(self, x: int, y: int, z: int):
-        fish: Fish = Fish(x, y, z)
-        self.creatures.append(fish)
-        self.cube[x, y, z] = fish
+        fish: Fish = Fish(x, y, z, self.store)
+        self.set_cell(x, y, z, fish)
 
     def spawn_shark(self, x: int, y: int, z: int):
-        shark: Shark = Shark(x, y, z)
-        self.creatures.append(shark)
-        self.cube[x, y, z] = shark
-
-    def place_fishes(self, number_fishes: int):
-        range_down = self.width
-        range_up = 0
-        if rank is not size - 1:
-            range_down = self.width - 1
-        if rank is not 1:
-            range_up = 1
-
-        for i in range(number_fishes):
-            while True:
-                x = random.randrange(0, self.length)
-                y = random.randrange(range_up, range_down)
-                z = random.randrange(0, self.height)
-                if not self.cube[x, y, z]:
-                    self.spawn_fish(x, y, z)
-                    break
-
-    def place_sharks(self, number_sharks):
-        range_down = self.width
-        range_up = 0
-        if rank is not size - 1:
-            range_down = self.width - 1
-        if rank is not 1:
-            range_up = 1
-
-        for i in range(number_sharks):
-            while True:
-                x = random.randrange(0, self.length)
-                y = random.randrange(range_up, range_down)
-                z = random.randrange(0, self.height)
-                if not self.cube[x, y, z]:
-                    self.spawn_shark(x, y, z)
-                    break
-
-    def populate_world(self, number_fishes, number_sharks):
-        self.number_fishes = number_fishes
-        self.number_sharks = number_sharks
-        self.place_fishes(self.number_fishes)
-        self.place_sharks(self.number_sharks)
+        shark: Shark = Shark(x, y, z, self.store)
+        self.set_cell(x, y, z, shark)
+
+    def get_empty_cells(self, number: int, region: tuple):
+        # Distinct empty cells of the region, all drawn at once without replacement
+        bounds = [axis.indices(size)[:2] for axis, size in zip(region, self.shape)]
+        shape = tuple(stop - start for start, stop in bounds)
+        occupied = self.get_species_region(region) != self.EMPTY_CELL
+        if occupied.any():
+            chosen = self.random.choice(numpy.flatnonzero(~occupied), number, replace=False)
+        else:
+            chosen = self.random.choice(int(numpy.prod(shape)), number, replace=False)
+        positions = numpy.unravel_index(chosen, shape)
+        return numpy.ravel_multi_index(tuple(position + start for position, (start, _) in zip(positions, bounds)),
+                                       self.shape)
+
+    def place_creatures(self, cells, species: int, energy=None, fertility=0):
+        # Newborns unless the energy and fertility of every creature are given
+        creature_class = self.CREATURES[species]
+        x, y, z = numpy.unravel_index(cells, self.cube.shape)
+        slots = self.store.spawn_many(species, x, y, z, creature_class.ENERGY if energy is None else energy, fertility)
+        creatures = numpy.empty(len(slots), dtype=object)
+        creatures[:] = creature_class.views(self.store, slots)
+        self.cube.reshape(-1)[cells] = creatures
+        self.species.reshape(-1)[cells] = species
+
+    def populate_world(self, number_fishes, number_sharks, region: tuple = (slice(None),) * 3):
+        cells = self.get_empty_cells(number_fishes + number_sharks, region)
+        self.place_creatures(cells[:number_fishes], self.FISH_CELL)
+        self.place_creatures(cells[number_fishes:], self.SHARK_CELL)
+        self.refresh_creatures()
+
+    def populate_from_species(self, species, region: tuple = (slice(None),) * 3):
+        # Creatures start where a snapshot shows them, with the energy and fertility of newborns
+        bounds = [axis.indices(size)[:2] for axis, size in zip(region, self.shape)]
+        for code in self.CREATURES:
+            positions = numpy.nonzero(species == code)
+            self.place_creatures(numpy.ravel_multi_index(
+                tuple(position + start for position, (start, _) in zip(positions, bounds)), self.shape), code)
+        self.refresh_creatures()
+
+    def run(self, generations: int):
+        # Population of every generation, the initial one included
+        fishes = numpy.zeros(generations + 1, dtype=numpy.int64)
+        sharks = numpy.zeros(generations + 1, dtype=numpy.int64)
+        self.refresh_creatures()
+        fishes[0], sharks[0] = self.number_fishes, self.number_sharks
+        for generation in range(1, generations + 1):
+            self.evolve_world()
+            fishes[generation], sharks[generation] = self.number_fishes, self.number_sharks
+        return fishes, sharks
 
     def get_world_cube_image(self):
         cells = numpy.zeros((self.length, self.width, self.height), dtype=int)
@@ -97,238 +126,275 @@ class World:
         return cells_colors, cells
 
     def get_world_image(self):
+        # matplotlib is only loaded by the process drawing voxels, not by every worker importing the world
+        import matplotlib.pyplot as plt
+        from mpl_toolkits.mplot3d import Axes3D  # noqa: F401 registers the 3d projection
         world_cube_colors, world_cube_image = self.get_world_cube_image()
         figure = plt.figure()
-        ax = figure.gca(projection='3d')
+        ax = figure.add_subplot(projection='3d')
         ax.voxels(world_cube_image, facecolors=world_cube_colors, edgecolor='k')
         return figure
 
     def show_world(self):
+        import matplotlib.pyplot as plt
         figure = self.get_world_image()
         plt.show(block=False)
         plt.close(figure)
 
-    def save_world(self, filename):
+    def save_world(self, filename, view: str = 'voxels', scale: int = 1):
+        if view != 'voxels':
+            # The renderer takes its colours from this class, so it is imported once the class exists
+            from app.render import save_image
+            save_image(filename, self.get_species_grid(), view, scale)
+            return
+        import matplotlib.pyplot as plt
         figure = self.get_world_image()
         plt.savefig(filename, dpi=72, bbox_inches='tight', pad_inches=0)
         plt.close(figure)
 
-    def get_creature_neighbours(self, creature):
-        neighbours = list()
-
-        neighbours.append((self.cube[creature.x][creature.y][
-                               creature.z + 1] if creature.z + 1 < self.height else None,
-                           (creature.x, creature.y, creature.z + 1)))
-        neighbours.append((self.cube[creature.x][creature.y][
-                               creature.z - 1] if creature.z - 1 >= 0 else None,
-                           (creature.x, creature.y, creature.z - 1)))
-        neighbours.append((self.cube[creature.x][creature.y + 1][
-                               creature.z] if creature.y + 1 < self.width else None,
-                           (creature.x, creature.y + 1, creature.z)))
-        neighbours.append((self.cube[creature.x][creature.y - 1][
-                               creature.z] if creature.y - 1 >= 0 else None,
-                           (creature.x, creature.y - 1, creature.z)))
-        neighbours.append((self.cube[creature.x + 1][creature.y][
-                               creature.z] if creature.x + 1 < self.length else None,
-                           (creature.x + 1, creature.y, creature.z)))
-        neighbours.append((self.cube[creature.x - 1][creature.y][
-                               creature.z] if creature.x - 1 >= 0 else None,
-                           (creature.x - 1, creature.y, creature.z)))
-        neighbours.append((self.cube[creature.x][creature.y + 1][
-                               creature.z - 1] if creature.y + 1 < self.width and creature.z - 1 >= 0 else None,
-                           (creature.x, creature.y + 1, creature.z - 1)))
-        neighbours.append((self.cube[creature.x][creature.y + 1][
-                               creature.z + 1] if creature.y + 1 < self.width and creature.z + 1 < self.height else None,
-                           (creature.x, creature.y + 1, creature.z + 1)))
-        neighbours.append((self.cube[creature.x][creature.y - 1][
-                               creature.z - 1] if creature.y - 1 >= 0 and creature.z - 1 >= 0 else None,
-                           (creature.x, creature.y - 1, creature.z - 1)))
-        neighbours.append((self.cube[creature.x][creature.y - 1][
-                               creature.z + 1] if creature.y - 1 >= 0 and creature.z + 1 < self.height else None,
-                           (creature.x, creature.y - 1, creature.z + 1)))
-        neighbours.append((self.cube[creature.x + 1][creature.y + 1][
-                               creature.z] if creature.x + 1 < self.length and creature.y + 1 < self.width else None,
-                           (creature.x + 1, creature.y + 1, creature.z)))
-        neighbours.append((self.cube[creature.x + 1][creature.y - 1][
-                               creature.z] if creature.x + 1 < self.length and creature.y - 1 >= 0 else None,
-                           (creature.x + 1, creature.y - 1, creature.z)))
-        neighbours.append((self.cube[creature.x + 1][creature.y][
-                               creature.z - 1] if creature.x + 1 < self.length and creature.z - 1 >= 0 else None,
-                           (creature.x + 1, creature.y, creature.z - 1)))
-        neighbours.append((self.cube[creature.x + 1][creature.y][
-                               creature.z + 1] if creature.x + 1 < self.length and creature.z + 1 < self.height else None,
-                           (creature.x + 1, creature.y, creature.z + 1)))
-        neighbours.append((self.cube[creature.x - 1][creature.y + 1][
-                               creature.z] if creature.x - 1 >= 0 and creature.y + 1 < self.width else None,
-                           (creature.x - 1, creature.y + 1, creature.z)))
-        neighbours.append((self.cube[creature.x - 1][creature.y - 1][
-                               creature.z] if creature.x - 1 >= 0 and creature.y - 1 >= 0 else None,
-                           (creature.x - 1, creature.y - 1, creature.z)))
-        neighbours.append((self.cube[creature.x - 1][creature.y][
-                               creature.z - 1] if creature.x - 1 >= 0 and creature.z - 1 >= 0 else None,
-                           (creature.x - 1, creature.y, creature.z - 1)))
-        neighbours.append((self.cube[creature.x - 1][creature.y][
-                               creature.z + 1] if creature.x - 1 >= 0 and creature.z + 1 < self.height else None,
-                           (creature.x - 1, creature.y, creature.z + 1)))
-        neighbours.append((self.cube[creature.x + 1][creature.y + 1][
-                               creature.z - 1] if creature.x + 1 < self.length and creature.y + 1 < self.width and creature.z - 1 >= 0 else None,
-                           (creature.x + 1, creature.y + 1, creature.z - 1)))
-        neighbours.append((self.cube[creature.x + 1][creature.y + 1][
-                               creature.z + 1] if creature.x + 1 < self.length and creature.y + 1 < self.width and creature.z + 1 < self.height else None,
-                           (creature.x + 1, creature.y + 1, creature.z + 1)))
-        neighbours.append((self.cube[creature.x + 1][creature.y - 1][
-                               creature.z - 1] if creature.x + 1 < self.length and creature.y - 1 >= 0 and creature.z - 1 >= 0 else None,
-                           (creature.x + 1, creature.y - 1, creature.z - 1)))
-        neighbours.append((self.cube[creature.x + 1][creature.y - 1][
-                               creature.z + 1] if creature.x + 1 < self.length and creature.y - 1 >= 0 and creature.z + 1 < self.height else None,
-                           (creature.x + 1, creature.y - 1, creature.z + 1)))
-        neighbours.append((self.cube[creature.x - 1][creature.y + 1][
-                               creature.z - 1] if creature.x - 1 >= 0 and creature.y + 1 < self.width and creature.z - 1 >= 0 else None,
-                           (creature.x - 1, creature.y + 1, creature.z - 1)))
-        neighbours.append((self.cube[creature.x - 1][creature.y + 1][
-                               creature.z + 1] if creature.x - 1 >= 0 and creature.y + 1 < self.width and creature.z + 1 < self.height else None,
-                           (creature.x - 1, creature.y + 1, creature.z + 1)))
-        neighbours.append((self.cube[creature.x - 1][creature.y - 1][
-                               creature.z - 1] if creature.x - 1 >= 0 and creature.y - 1 >= 0 and creature.z - 1 >= 0 else None,
-                           (creature.x - 1, creature.y - 1, creature.z - 1)))
-        neighbours.append((self.cube[creature.x - 1][creature.y - 1][
-                               creature.z + 1] if creature.x - 1 >= 0 and creature.y - 1 >= 0 and creature.z + 1 < self.height else None,
-                           (creature.x - 1, creature.y - 1, creature.z + 1)))
-
-        return neighbours
+    @property
+    def neighbourhood(self) -> Neighbourhood:
+        return get_neighbourhood(self.shape, self.periodic)
+
+    def get_cell(self, x: int, y: int, z: int) -> int:
+        return (x * self.width + y) * self.height + z
+
+    def get_position(self, cell: int):
+        x, rest = divmod(int(cell), self.width * self.height)
+        y, z = divmod(rest, self.height)
+        return x, y, z
+
+    def set_cell(self, x: int, y: int, z: int, cell):
+        self.cube[x, y, z] = cell
+        self.species[x, y, z] = self.EMPTY_CELL if cell is self.EMPTY_CELL else cell.SPECIES
+
+    def get_neighbour_cells(self, creature, species: int):
+        cell = self.get_cell(creature.x, creature.y, creature.z)
+        return self.neighbourhood.get_cells(self.species.reshape(-1), cell, species)
 
     def evolve_world(self):
-        random.shuffle(self.creatures)
-        number_creatures = len(self.creatures)
-        for i in range(number_creatures):
-            creature = self.creatures[i]
-            if creature.is_dead():
+        self.start_generation()
+        self.evolve_region((slice(None),) * 3)
+
+    def start_generation(self):
+        self.generation += 1
+        self.store.acted[:] = False
+
+    def evolve_region(self, region: tuple):
+        slots, _ = self.get_region_slots(region)
+        slots, starving = self.start_turns(slots, self.store.acted, self.store.fertility, self.store.energy)
+        x, y, z = self.store.x[slots], self.store.y[slots], self.store.z[slots]
+        # One batch of draws per generation: the first sets the order creatures act in, the second their move
+        draws = self.streams.get_uniforms(self.generation, self.get_cell(x, y, z), 2)
+        order = numpy.argsort(draws[:, 0], kind='stable')
+        creatures = self.cube[x[order], y[order], z[order]].tolist()
+        for creature, draw, fertility, energy, starved in zip(
+                creatures, draws[order, 1].tolist(), self.store.fertility[slots[order]].tolist(),
+                self.store.energy[slots[order]].tolist(), starving[order].tolist()):
+            # A creature eaten before its turn no longer stands where it was
+            if self.cube[creature.x, creature.y, creature.z] is not creature:
                 continue
-            if isinstance(creature, Shark):
-                self.evolve_shark(creature)
-            else:
-                self.evolve_fish(creature)
-        self.creatures = [creature for creature in self.creatures
-                          if not creature.is_dead()]
-
-    def evolve_fish(self, creature):
-        neighbours = self.get_creature_neighbours(creature)
-        creature.fertility += 1
-        creature.energy -= 1
-        if creature.energy < 0:
-            creature.state = creature.DEAD
-            self.cube[creature.x][creature.y][creature.z] = self.EMPTY_CELL
-            return
-        moved = False
-        empty_cells = [cell for cell in neighbours if cell[0] == self.EMPTY_CELL]
-        try:
-            empty_cell = random.choice(empty_cells)
-            xp = empty_cell[1][0]
-            yp = empty_cell[1][1]
-            zp = empty_cell[1][2]
-            moved = True
-        except IndexError:
-            xp, yp, zp = creature.x, creature.y, creature.z
-
-        if moved:
-            x, y, z = creature.x, creature.y, creature.z
-            creature.x, creature.y, creature.z = xp, yp, zp
-            self.cube[xp][yp][zp] = creature
-            if creature.fertility >= creature.FERTILITY_THRESHOLD:
-                creature.fertility = 0
-                self.spawn_fish(x, y, z)
+            creature.fertility, creature.energy = fertility, energy
+            if starved:
+                creature.state = creature.DEAD
+                self.set_cell(creature.x, creature.y, creature.z, self.EMPTY_CELL)
+                self.deaths += 1
+            elif isinstance(creature, Shark):
+                self.evolve_shark(creature, draw)
             else:
-                self.cube[x][y][z] = self.EMPTY_CELL
-
-    def evolve_shark(self, creature):
-        neighbours = self.get_creature_neighbours(creature)
-        creature.fertility += 1
-        creature.energy -= 1
-        if creature.energy < 0:
-            creature.state = creature.DEAD
-            self.cube[creature.x][creature.y][creature.z] = self.EMPTY_CELL
-            return
-        moved = False
-        fishes = [cell[0] for cell in neighbours if isinstance(cell[0], Fish) is True]
-        try:
-            fish = random.choice(fishes)
-            moved = True
+                self.evolve_fish(creature, draw)
+        self.store.save(creatures, FIELDS)
+        self.refresh_creatures()
+
+    @staticmethod
+    def start_turns(creatures, acted, fertility, energy) -> tuple:
+        # Only creatures standing in the region that have not acted yet in this generation are evolved: they are
+        # marked as acted, one generation older and one unit of energy poorer. `creatures` index the other arrays;
+        # the ones evolved and which of them starve are returned
+        creatures = creatures[~acted[creatures]]
+        acted[creatures] = True
+        fertility[creatures] += 1
+        energy[creatures] -= 1
+        return creatures, energy[creatures] < 0
+
+    def count_predations(self, eaten, cells, prey_acted) -> int:
+        # A fish in a ghost cell is only a copy, its owner counts it when the shark arrives there, unless it moved
+        # there itself in this generation. A single prey is only looked up in the interior when it did not move
+        if numpy.ndim(eaten) == 0:
+            return int(bool(eaten) and (bool(prey_acted) or bool(self.get_interior_mask(cells))))
+        return int(numpy.count_nonzero(eaten & (prey_acted | self.get_interior_mask(cells))))
+
+    @staticmethod
+    def pick(cells, draw: float) -> int:
+        return cells[int(draw * len(cells))]
+
+    def evolve_fish(self, creature, draw: float):
+        empty_cells = self.get_neighbour_cells(creature, self.EMPTY_CELL)
+        if len(empty_cells):
+            self.move_creature(creature, self.pick(empty_cells, draw), self.spawn_fish)
+
+    def evolve_shark(self, creature, draw: float):
+        fish_cells = self.get_neighbour_cells(creature, self.FISH_CELL)
+        if len(fish_cells):
+            cell = self.pick(fish_cells, draw)
+            prey = self.cube.flat[cell]
+            self.predations += self.count_predations(True, cell, prey.acted)
+            prey.state = Fish.DEAD
             creature.energy += 1
-            self.cube[fish.x][fish.y][fish.z].state = fish.DEAD
-            self.cube[fish.x][fish.y][fish.z] = self.EMPTY_CELL
-            xp = fish.x
-            yp = fish.y
-            zp = fish.z
-        except IndexError:
-            pass
-
-        if not moved:
-            empty_cells = [cell for cell in neighbours if cell[0] == self.EMPTY_CELL]
-            try:
-                empty_cell = random.choice(empty_cells)
-                xp = empty_cell[1][0]
-                yp = empty_cell[1][1]
-                zp = empty_cell[1][2]
-                moved = True
-            except IndexError:
-                xp, yp, zp = creature.x, creature.y, creature.z
-
-        if moved:
-            x, y, z = creature.x, creature.y, creature.z
-            creature.x, creature.y, creature.z = xp, yp, zp
-            self.cube[xp][yp][zp] = creature
-            if creature.fertility >= creature.FERTILITY_THRESHOLD:
-                creature.fertility = 0
-                self.spawn_shark(x, y, z)
-            else:
-                self.cube[x][y][z] = self.EMPTY_CELL
-
-    def merge_creatures_positions_from_up(self, data):
-        for x in range(self.length):
-            for z in range(self.height):
-                if self.cube[x, self.width - 2, z] is self.EMPTY_CELL:
-                    self.cube[x, self.width - 2, z] = data[x, 0, z]
-                elif (isinstance(self.cube[x, self.width - 2, z], Shark) or isinstance(self.cube[x, self.width - 2, z],
-                                                                                       Fish)) and isinstance(
-                    data[x, 0, z], Fish):
-                    creature = self.cube[x, self.width - 2, z]
-                    creature.x, creature.y, creature.z = x, self.width - 2, z
-                    neighbours = self.get_creature_neighbours(creature)
-                    empty_cells = [cell for cell in neighbours if cell[0] == self.EMPTY_CELL]
-                    try:
-                        empty_cell = random.choice(empty_cells)
-                        xp = empty_cell[1][0]
-                        yp = empty_cell[1][1]
-                        zp = empty_cell[1][2]
-                        self.cube[xp, yp, zp] = data[x, 0, z]
-                    except IndexError:
-                        pass
-                elif isinstance(self.cube[x, self.width - 2, z], Fish) and isinstance(data[x, 0, z],
-                                                                                      Shark):
-                    self.cube[x, self.width - 2, z] = data[x, 0, z]
-
-    def merge_creatures_positions_from_down(self, data):
-        for x in range(self.length):
-            for z in range(self.height):
-                if self.cube[x, 1, z] is self.EMPTY_CELL:
-                    self.cube[x, 1, z] = data[x, data.shape[1] - 1, z]
-                elif (isinstance(self.cube[x, 1, z], Shark) or isinstance(
-                        self.cube[x, 1, z], Fish)) and isinstance(data[x, data.shape[1] - 1, z], Fish):
-                    creature = self.cube[x, 1, z]
-                    creature.x, creature.y, creature.z = x, 1, z
-                    neighbours = self.get_creature_neighbours(self.cube[x, 1, z])
-                    empty_cells = [cell for cell in neighbours if cell[0] == self.EMPTY_CELL]
-                    try:
-                        empty_cell = random.choice(empty_cells)
-                        xp = empty_cell[1][0]
-                        yp = empty_cell[1][1]
-                        zp = empty_cell[1][2]
-                        self.cube[xp, yp, zp] = data[x, data.shape[1] - 1, z]
-                    except IndexError:
-                        pass
-                elif isinstance(self.cube[x, 1, z], Fish) and isinstance(data[x, data.shape[1] - 1, z],
-                                                                         Shark):
-                    self.cube[x, 1, z] = data[x, data.shape[1] - 1, z]
+            self.move_creature(creature, cell, self.spawn_shark)
+            return
+        empty_cells = self.get_neighbour_cells(creature, self.EMPTY_CELL)
+        if len(empty_cells):
+            self.move_creature(creature, self.pick(empty_cells, draw), self.spawn_shark)
+
+    def move_creature(self, creature, cell: int, spawn):
+        x, y, z = creature.x, creature.y, creature.z
+        creature.x, creature.y, creature.z = self.get_position(cell)
+        self.set_cell(creature.x, creature.y, creature.z, creature)
+        if creature.fertility >= creature.FERTILITY_THRESHOLD:
+            creature.fertility = 0
+            spawn(x, y, z)
+            self.births += 1
+            self.cube[x, y, z].acted = True
+        else:
+            self.set_cell(x, y, z, self.EMPTY_CELL)
+
+    def get_species_grid(self):
+        return self.species
+
+    def get_region_shape(self, region: tuple) -> tuple:
+        return tuple(len(range(*axis.indices(size))) for axis, size in zip(region, self.shape))
+
+    def get_species_region(self, region: tuple):
+        return self.get_species_grid()[region]
+
+    def get_region_creatures(self, region: tuple):
+        # Positions relative to the region, species and energy of the creatures standing in it
+        slots, positions = self.get_region_slots(region)
+        return positions, self.store.species[slots], self.store.energy[slots]
+
+    def get_neighbours_batch(self, cells):
+        # The 26 neighbours of every cell and what lives in them
+        return self.neighbourhood.get_cells_batch(self.get_species_grid().reshape(-1), cells)
+
+    def get_region_slots(self, region: tuple):
+        # Slots of the creatures standing in the region, and their positions relative to its first cell
+        slots = self.store.get_slots()
+        positions = (self.store.x[slots], self.store.y[slots], self.store.z[slots])
+        bounds = [axis.indices(size)[:2] for axis, size in zip(region, self.shape)]
+        inside = numpy.ones(slots.size, dtype=bool)
+        for position, (start, stop) in zip(positions, bounds):
+            inside &= (position >= start) & (position < stop)
+        return slots[inside], tuple(position[inside] - start for position, (start, _) in zip(positions, bounds))
+
+    def pack_region(self, region: tuple, data):
+        data['species'] = self.species[region]
+        data['energy'] = 0
+        data['fertility'] = 0
+        slots, positions = self.get_region_slots(region)
+        data['energy'][positions] = self.store.energy[slots]
+        data['fertility'][positions] = self.store.fertility[slots]
+
+    def pack_movers(self, region: tuple, data):
+        # Only the creatures that moved into the region during this generation, not the copies living there
+        data[...] = 0
+        slots, positions = self.get_region_slots(region)
+        movers = self.store.acted[slots]
+        slots, positions = slots[movers], tuple(position[movers] for position in positions)
+        data['species'][positions] = self.store.species[slots]
+        data['energy'][positions] = self.store.energy[slots]
+        data['fertility'][positions] = self.store.fertility[slots]
+
+    def get_region_cells(self, region: tuple):
+        # Flat indices of the cells of the region, in its own shape
+        return numpy.ravel_multi_index(numpy.ix_(*(numpy.arange(*axis.indices(size)) for axis, size in
+                                                   zip(region, self.shape))), self.shape)
+
+    def clear_region(self, region: tuple):
+        slots, _ = self.get_region_slots(region)
+        self.store.kill_many(slots)
+        self.cube[region] = self.EMPTY_CELL
+        self.species[region] = self.EMPTY_CELL
+        self.refresh_creatures()
+
+    def set_region(self, region: tuple, data):
+        self.clear_region(region)
+        cells = self.get_region_cells(region)
+        species = data['species']
+        for code in self.CREATURES:
+            arriving = species == code
+            self.place_creatures(cells[arriving], code, data['energy'][arriving], data['fertility'][arriving])
+        self.refresh_creatures()
+
+    def refresh_creatures(self):
+        self.number_fishes = self.store.count(self.FISH_CELL)
+        self.number_sharks = self.store.count(self.SHARK_CELL)
+
+    def get_inside_mask(self, cells, region: tuple):
+        bounds = [axis.indices(size)[:2] for axis, size in zip(region, self.shape)]
+        inside = numpy.ones(numpy.shape(cells), dtype=bool)
+        # A region over the whole world, as the interior of a world on its own, holds every cell
+        if all(start == 0 and stop == size for (start, stop), size in zip(bounds, self.shape)):
+            return inside
+        positions = numpy.unravel_index(cells, self.shape)
+        for position, (start, stop) in zip(positions, bounds):
+            inside &= (position >= start) & (position < stop)
+        return inside
+
+    def get_interior_mask(self, cells):
+        # Ghost cells are overwritten by the next border refresh, creatures settle only in the cells owned here
+        return self.get_inside_mask(cells, self.interior)
+
+    def get_settling_cells(self, cells):
+        # Every displaced creature ranks the free interior cells around it by a random key; a cell claimed by two
+        # goes to the first in line and the others try again among the cells left, until none can settle. Cells
+        # that stay at -1 had no room.
+        targets = numpy.full(len(cells), -1, dtype=numpy.intp)
+        waiting = numpy.arange(len(cells))
+        while waiting.size:
+            neighbours, contents = self.get_neighbours_batch(cells[waiting])
+            free = (contents == self.EMPTY_CELL) & self.get_interior_mask(neighbours) & ~numpy.isin(neighbours, targets)
+            choices = numpy.where(free, self.random.random(free.shape), -1.0).argmax(axis=1)
+            settling = free[numpy.arange(waiting.size), choices]
+            waiting = waiting[settling]
+            chosen = neighbours[settling, choices[settling]]
+            _, first = numpy.unique(chosen, return_index=True)
+            targets[waiting[first]] = chosen[first]
+            waiting = numpy.delete(waiting, first)
+        return targets
+
+    def get_merge_masks(self, local, species):
+        # Precedence on the whole plane at once: an empty cell takes the incoming creature, an incoming shark eats
+        # the fish living here, an incoming fish that collides with a creature has to settle around it
+        taken = (local == self.EMPTY_CELL) & (species != self.EMPTY_CELL)
+        eaten = (local == self.FISH_CELL) & (species == self.SHARK_CELL)
+        displaced = (local != self.EMPTY_CELL) & (species == self.FISH_CELL)
+        return taken | eaten, eaten, displaced
+
+    def count_merge_events(self, species, arriving, eaten, displaced, settled):
+        # A creature that finds no room, a shark landing on a shark or a fish with no free cell around, is lost
+        lost = (species != self.EMPTY_CELL) & ~arriving & ~displaced
+        self.deaths += int(numpy.count_nonzero(lost)) + int(numpy.count_nonzero(~settled))
+        self.predations += int(numpy.count_nonzero(eaten))
+
+    def merge_region(self, region: tuple, data):
+        species, energy, fertility = data['species'], data['energy'], data['fertility']
+        arriving, eaten, displaced = self.get_merge_masks(self.species[region], species)
+        if eaten.any():
+            slots, positions = self.get_region_slots(region)
+            grid = numpy.zeros(eaten.shape, dtype=numpy.intp)
+            grid[positions] = slots
+            self.store.kill_many(grid[eaten])
+        cells = self.get_region_cells(region)
+        for code in self.CREATURES:
+            mask = arriving & (species == code)
+            self.place_creatures(cells[mask], code, energy[mask], fertility[mask])
+        targets = self.get_settling_cells(cells[displaced])
+        settled = targets >= 0
+        self.place_creatures(targets[settled], self.FISH_CELL, energy[displaced][settled],
+                             fertility[displaced][settled])
+        self.count_merge_events(species, arriving, eaten, displaced, settled)
+        self.refresh_creatures()
 
     @staticmethod
     def init_empty_cube(self):
@@ -0,0 +1,65 @@
+import numpy
+from mpi4py import MPI
+
+from app.models.fish import Fish
+from app.models.shark import Shark
+from app.trajectory import FRAME_HEAD_DTYPE, HEADER_DTYPE, count_frames_before, get_frame_dtype, get_frame_head, \
+    get_header
+
+
+class CollectiveTrajectoryWriter:
+    def __init__(self, comm: MPI.Comm, filename: str, shape: tuple, interval: int = 1, world=None, region=None,
+                 start: tuple = (0, 0, 0), seed: int = None, first_generation: int = None):
+        self.comm = comm
+        self.rank: int = comm.Get_rank()
+        self.shape = shape
+        self.filetype = MPI.BYTE
+        self.frame_size = get_frame_dtype(shape).itemsize
+        # A restart keeps the header and the frames saved before its first generation, rank 0 counts them
+        self.number_written = comm.bcast(count_frames_before(filename, shape, first_generation)
+                                         if self.rank == 0 and first_generation is not None else 0, root=0)
+        self.file = MPI.File.Open(comm, filename, MPI.MODE_WRONLY | MPI.MODE_CREATE)
+        self.file.Set_size(HEADER_DTYPE.itemsize + self.number_written * self.frame_size if self.number_written else 0)
+        self.counts = numpy.zeros(2, dtype=numpy.int64)
+        self.total_counts = numpy.zeros(2, dtype=numpy.int64)
+
+        if self.rank == 0:
+            # Rank 0 only writes the metadata: the file header and the head of every frame
+            self.part = numpy.zeros(0, dtype=numpy.uint8)
+            if not self.number_written:
+                self.file.Write_at(0, [get_header(shape, interval, seed), MPI.BYTE])
+        elif world is not None:
+            self.set_block(world, region, start)
+
+    def set_block(self, world, region, start: tuple) -> None:
+        # Each worker writes its block straight into the species grid of the frame
+        if self.filetype != MPI.BYTE:
+            self.filetype.Free()
+        self.world = world
+        self.region = region
+        self.part = numpy.zeros(world.get_region_shape(region), dtype=numpy.uint8)
+        self.filetype = MPI.BYTE
+        if self.part.size:
+            self.filetype = MPI.BYTE.Create_subarray(self.shape, self.part.shape, start).Commit()
+
+    def write(self, generation: int) -> None:
+        offset = HEADER_DTYPE.itemsize + self.number_written * self.frame_size
+        if self.rank != 0:
+            self.part[...] = self.world.get_species_region(self.region)
+            self.counts[0] = numpy.count_nonzero(self.part == Fish.SPECIES)
+            self.counts[1] = numpy.count_nonzero(self.part == Shark.SPECIES)
+        self.comm.Reduce(self.counts, self.total_counts, op=MPI.SUM, root=0)
+
+        if self.rank == 0:
+            head = get_frame_head(generation, self.total_counts[0], self.total_counts[1])
+            self.file.Set_view(offset, MPI.BYTE, self.filetype)
+            self.file.Write_all([head, MPI.BYTE])
+        else:
+            self.file.Set_view(offset + FRAME_HEAD_DTYPE.itemsize, MPI.BYTE, self.filetype)
+            self.file.Write_all([self.part, MPI.BYTE])
+        self.number_written += 1
+
+    def close(self) -> None:
+        if self.filetype != MPI.BYTE:
+            self.filetype.Free()
+        self.file.Close()
@@ -0,0 +1,114 @@
+import json
+import time
+import numpy
+from mpi4py import MPI
+
+# Wall time of every generation is split into these phases, the slowest process setting the time of each
+PHASES = ('evolve', 'halo', 'gather', 'io', 'balance')
+
+
+class Profiler:
+    def __init__(self, comm: MPI.Comm, generations: int, enabled: bool = False, trace: str = None):
+        self.comm = comm
+        self.rank: int = comm.Get_rank()
+        # Generation phases are always timed, a few clock reads a generation; finer timings, counters and the
+        # timeline only when enabled
+        self.enabled = enabled or trace is not None
+        self.trace = trace
+        self.timings = numpy.zeros((generations, len(PHASES)))
+        self.creatures = numpy.zeros(generations, dtype=numpy.int64)
+        self.step = 0
+        self.wall_time = 0.0
+        self.start_time = 0.0
+        self.details = dict()
+        self.counters = dict()
+        self.summary = dict()
+        self.events = list()
+        if trace is not None:
+            # Timelines of all processes start together
+            comm.Barrier()
+        self.origin = time.perf_counter()
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+
+    def stop(self) -> None:
+        self.wall_time = time.perf_counter() - self.start_time
+
+    def lap(self, phase: str, start_time: float) -> float:
+        stop_time = time.perf_counter()
+        self.timings[self.step, PHASES.index(phase)] += stop_time - start_time
+        if self.trace is not None:
+            self.events.append((phase, start_time, stop_time, 0))
+        return stop_time
+
+    def record(self, name: str, start_time: float, stop_time: float, thread: int = 0) -> None:
+        self.details[name] = self.details.get(name, 0.0) + stop_time - start_time
+        if self.trace is not None:
+            self.events.append((name, start_time, stop_time, thread))
+
+    def count(self, name: str, number: int) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + int(number)
+
+    def hook(self, target, method: str, name: str) -> None:
+        # The method of this one object is replaced with a timed one, so nothing is paid when disabled; methods an
+        # engine does not have are skipped
+        function = getattr(target, method, None)
+        if not self.enabled or function is None or getattr(function, 'profiled', False):
+            return
+
+        def timed(*args, **kwargs):
+            start_time = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.record(name, start_time, time.perf_counter())
+            return result
+
+        timed.profiled = True
+        setattr(target, method, timed)
+
+    def reduce(self) -> None:
+        # Rank 0 ends up with the slowest process's times, the creatures of the whole world and, when enabled, the
+        # spread of every finer timing over the processes that recorded it and the counters of all of them
+        timings = numpy.zeros_like(self.timings)
+        creatures = numpy.zeros_like(self.creatures)
+        self.comm.Reduce(self.timings, timings, op=MPI.MAX, root=0)
+        self.comm.Reduce(self.creatures, creatures, op=MPI.SUM, root=0)
+        wall_time = self.comm.reduce(self.wall_time, op=MPI.MAX, root=0)
+        details = self.comm.gather(self.details, root=0) if self.enabled else None
+        counters = self.comm.gather(self.counters, root=0) if self.enabled else None
+        # Every process counts time from its own origin, taken right after the others
+        events = self.comm.gather([(name, start_time - self.origin, stop_time - self.origin, thread)
+                                   for name, start_time, stop_time, thread in self.events], root=0) \
+            if self.trace is not None else None
+        if self.rank != 0:
+            return
+        self.timings, self.creatures, self.wall_time = timings, creatures, wall_time
+        if self.enabled:
+            for name in sorted(set().union(*details)):
+                seconds = [detail[name] for detail in details if name in detail]
+                self.summary[name] = {'min': min(seconds), 'mean': sum(seconds) / len(seconds), 'max': max(seconds),
+                                      'processes': len(seconds)}
+            self.counters = {name: sum(counter.get(name, 0) for counter in counters)
+                             for name in sorted(set().union(*counters))}
+        if events is not None:
+            self.write_trace(events)
+
+    def write_trace(self, events: list) -> None:
+        # Chrome trace event format, one process per rank, as read by chrome://tracing and Perfetto
+        trace = [{'name': name, 'ph': 'X', 'pid': rank, 'tid': thread, 'ts': start_time * 1e6,
+                  'dur': (stop_time - start_time) * 1e6}
+                 for rank, rank_events in enumerate(events) for name, start_time, stop_time, thread in rank_events]
+        trace += [{'name': 'process_name', 'ph': 'M', 'pid': rank, 'args': {'name': 'rank {}'.format(rank)}}
+                  for rank in range(len(events))]
+        with open(self.trace, 'w') as file:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, file)
+
+    def format_summary(self) -> str:
+        lines = ['{:>10}: {:.4f} s'.format(phase, seconds) for phase, seconds in
+                 zip(PHASES, self.timings.sum(axis=0))]
+        lines += ['{:>10}: {:.4f} s min, {:.4f} s mean, {:.4f} s max over {} processes'.format(
+            name, times['min'], times['mean'], times['max'], times['processes'])
+            for name, times in self.summary.items()]
+        lines += ['{:>10}: {}'.format(name, number) for name, number in self.counters.items()]
+        return '\n'.join(lines)
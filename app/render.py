@@ -0,0 +1,93 @@
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy
+
+from app.models.world import World
+from app.trajectory import TrajectoryReader
+
+# RGB colour of every species code: water, fish, shark
+COLORS = numpy.array([tuple(bytes.fromhex(color[1:])) for color in (World.WATER_COLOR, World.FISH_COLOR,
+                                                                    World.SHARK_COLOR)], dtype=numpy.uint8)
+DEPTH_SHADE = 0.7
+
+
+def render_slice(species, axis: int = 2, index: int = None):
+    if index is None:
+        index = species.shape[axis] // 2
+    return COLORS[numpy.take(species, index, axis=axis)]
+
+
+def render_max_projection(species, axis: int = 2):
+    # Species codes are ordered by priority: a shark anywhere along the ray hides a fish, a fish hides water
+    return COLORS[species.max(axis=axis)]
+
+
+def render_depth(species, axis: int = 2):
+    # Each pixel shows the first creature along the ray, darker the further away it is
+    occupied = species != 0
+    depth = occupied.argmax(axis=axis)
+    visible = numpy.take_along_axis(species, numpy.expand_dims(depth, axis), axis=axis).squeeze(axis)
+    shade = 1.0 - DEPTH_SHADE * depth / max(species.shape[axis] - 1, 1)
+    image = COLORS[visible].astype(numpy.float32)
+    image[visible != 0] *= shade[visible != 0, None]
+    return image.astype(numpy.uint8)
+
+
+VIEWS = {'slice': render_slice, 'max': render_max_projection, 'depth': render_depth}
+
+
+def render(species, view: str = 'depth', scale: int = 1, **options):
+    image = VIEWS[view](species, **options)
+    if scale > 1:
+        image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+    return image
+
+
+def encode_png(image) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    height, width, _ = image.shape
+    # Every scanline starts with filter type 0 (no filter)
+    scanlines = numpy.zeros((height, width * 3 + 1), dtype=numpy.uint8)
+    scanlines[:, 1:] = image.reshape(height, width * 3)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)) + \
+        chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)) + chunk(b'IEND', b'')
+
+
+def write_png(filename: str, image) -> None:
+    try:
+        from PIL import Image
+    except ImportError:
+        with open(filename, 'wb') as file:
+            file.write(encode_png(image))
+        return
+    Image.fromarray(image, 'RGB').save(filename)
+
+
+def save_image(filename: str, species, view: str = 'depth', scale: int = 1, **options) -> None:
+    write_png(filename, render(species, view, scale, **options))
+
+
+def render_frames(trajectory: str, pattern: str, indices, view: str, scale: int, options: dict) -> None:
+    reader = TrajectoryReader(trajectory)
+    generations, _, _ = reader.get_populations()
+    for index in indices:
+        save_image(pattern.format(int(generations[index]) + 1), reader[index], view, scale, **options)
+
+
+def render_trajectory(trajectory: str, pattern: str, view: str = 'depth', scale: int = 1, workers: int = None,
+                      **options) -> None:
+    if view not in VIEWS:
+        raise ValueError('Trajectories are rendered as {} views, not {!r}.'.format(', '.join(VIEWS), view))
+    # Every worker process maps the trajectory itself, so frames are never pickled between processes
+    number_frames = len(TrajectoryReader(trajectory))
+    number_workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=number_workers) as executor:
+        futures = [executor.submit(render_frames, trajectory, pattern, range(start, number_frames, number_workers),
+                                   view, scale, options)
+                   for start in range(min(number_workers, number_frames))]
+        for future in futures:
+            future.result()
@@ -0,0 +1,128 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy
+from mpi4py import MPI
+
+from app.decomposition import Decomposition
+from app.models.vectorized_world import VectorizedWorld
+from app.trajectory import TrajectoryWriter
+from setup import DebugLogger, DATA_DIR, MAX_GENERATIONS, RENDER_SCALE, RENDER_VIEW, TRAJECTORY_FILE
+
+
+def get_region(region, length: int, width: int, height: int):
+    if region is None:
+        return (0, length), (0, width), (0, height)
+    return tuple(tuple(axis) for axis in region)
+
+
+def get_local_region(interior: tuple, offset: tuple, region):
+    # Local indices of the interior block cells that fall inside the region, and the first region cell they fill
+    local, start = list(), list()
+    for axis, axis_offset, (region_start, region_stop) in zip(interior, offset, region):
+        first = max(region_start, axis_offset) - axis_offset + axis.start
+        last = min(region_stop, axis_offset + axis.stop - axis.start) - axis_offset + axis.start
+        local.append(slice(first, max(first, last)))
+        start.append(max(region_start, axis_offset) - region_start)
+    return tuple(local), tuple(start)
+
+
+def write_snapshot(generation: int, frame) -> tuple:
+    start_time = time.perf_counter()
+    DebugLogger.info('Thread for generation: {} started'.format(generation))
+    world = VectorizedWorld(*frame.shape)
+    world.cube = frame
+    world.refresh_creatures()
+    DebugLogger.debug(
+        'Generation {}/{}: Fishes: {}, Sharks: {}'.format(generation + 1, MAX_GENERATIONS, world.number_fishes,
+                                                          world.number_sharks))
+    print('Generation {}/{}: Creatures: {}'.format(generation + 1, MAX_GENERATIONS,
+                                                   world.number_fishes + world.number_sharks))
+    world.save_world(DATA_DIR + '/world-{:04d}.png'.format(generation + 1), RENDER_VIEW, RENDER_SCALE)
+    DebugLogger.info('Thread for generation: {} saved the world'.format(generation + 1))
+    return start_time, time.perf_counter()
+
+
+class SnapshotSender:
+    TAG = 20
+
+    def __init__(self, comm: MPI.Comm, world, interior: tuple, offset: tuple, region, depth: int):
+        self.comm = comm
+        self.world = world
+        self.region, _ = get_local_region(interior, offset, region)
+        shape = world.get_region_shape(self.region)
+        # A ring of frames: a worker only waits when `depth` snapshots are still in flight
+        self.frames = numpy.zeros((depth,) + shape, dtype=numpy.uint8)
+        self.requests = [MPI.REQUEST_NULL] * depth
+        self.number_sent = 0
+
+    def send(self) -> None:
+        if self.frames[0].size == 0:
+            return
+        index = self.number_sent % len(self.frames)
+        self.requests[index].Wait()
+        self.frames[index] = self.world.get_species_region(self.region)
+        self.requests[index] = self.comm.Isend([self.frames[index], MPI.BYTE], dest=0, tag=self.TAG)
+        self.number_sent += 1
+
+    def close(self) -> None:
+        MPI.Request.Waitall(self.requests)
+
+
+class SnapshotCollector:
+    EXECUTORS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+    def __init__(self, comm: MPI.Comm, decomposition: Decomposition, region, writers: int, queue: int,
+                 executor: str = 'thread', formats: tuple = ('png',), interval: int = 1, seed: int = None,
+                 profiler=None, first_generation: int = None):
+        self.comm = comm
+        self.profiler = profiler
+        self.region = region
+        self.parts = list()
+        self.partition(decomposition)
+        self.shape = tuple(stop - start for start, stop in region)
+        self.formats = formats
+        self.trajectory = TrajectoryWriter(TRAJECTORY_FILE, self.shape, interval, seed, first_generation) \
+            if 'trajectory' in formats else None
+        self.executor = self.EXECUTORS[executor](max_workers=writers)
+        # Frames waiting for a writer are bounded, past that rank 0 stops receiving until one is written
+        self.pending = threading.BoundedSemaphore(queue)
+        if profiler is not None:
+            profiler.hook(self, 'receive', 'receive')
+
+    def partition(self, decomposition: Decomposition) -> None:
+        # The part of the region every worker sends, by its block of the world
+        self.parts = list()
+        for index, block in enumerate(decomposition.get_blocks()):
+            box = tuple(slice(max(start, block_start) - start, min(stop, block_stop) - start)
+                        for (start, stop), (block_start, block_stop) in zip(self.region, block))
+            if all(axis.stop > axis.start for axis in box):
+                self.parts.append((index + 1, box))
+
+    def receive(self, generation: int) -> None:
+        frame = numpy.zeros(self.shape, dtype=numpy.uint8)
+        parts = [numpy.zeros(frame[box].shape, dtype=numpy.uint8) for _, box in self.parts]
+        requests = [self.comm.Irecv([part, MPI.BYTE], source=process, tag=SnapshotSender.TAG)
+                    for part, (process, _) in zip(parts, self.parts)]
+        MPI.Request.Waitall(requests)
+        for part, (_, box) in zip(parts, self.parts):
+            frame[box] = part
+        if self.trajectory is not None:
+            self.trajectory.append(generation, frame)
+        if 'png' not in self.formats:
+            return
+        self.pending.acquire()
+        self.executor.submit(write_snapshot, generation, frame).add_done_callback(self.written)
+
+    def written(self, future) -> None:
+        self.pending.release()
+        if future.exception() is not None:
+            DebugLogger.error('Snapshot could not be written: {}'.format(future.exception()))
+        elif self.profiler is not None and self.profiler.enabled:
+            # Writers run beside the main thread, on a track of their own in the timeline
+            self.profiler.record('render', *future.result(), thread=1)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        if self.trajectory is not None:
+            self.trajectory.close()
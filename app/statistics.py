@@ -0,0 +1,92 @@
+import csv
+import os
+import numpy
+from mpi4py import MPI
+
+from app.models.world import World
+
+EVENTS = ('births', 'deaths', 'predations')
+
+
+class Statistics:
+    def __init__(self, comm: MPI.Comm, shape: tuple, filename: str = None, axis: int = 1, energy_bins: int = 32,
+                 depth: int = 4, first_generation: int = None):
+        # Every process takes part in the reductions, only rank 0 writes the time series
+        self.comm = comm
+        self.rank: int = comm.Get_rank()
+        self.shape = tuple(shape)
+        self.axis = axis
+        self.energy_bins = energy_bins
+        # One row of counts a generation: fishes, sharks, events, an energy histogram per species and the creatures
+        # of every plane across `axis`
+        self.size = 2 + len(EVENTS) + 2 * energy_bins + self.shape[axis]
+        self.rows = numpy.zeros((depth, self.size), dtype=numpy.int64)
+        self.requests = [MPI.REQUEST_NULL] * depth
+        self.number_sent = 0
+        self.file = None
+        self.writer = None
+        if self.rank == 0:
+            append = first_generation is not None and os.path.exists(filename)
+            if append:
+                self.truncate(filename, first_generation)
+            self.file = open(filename, 'a' if append else 'w', newline='')
+            self.writer = csv.writer(self.file)
+            if not append:
+                self.writer.writerow(self.get_header())
+
+    @staticmethod
+    def truncate(filename: str, generation: int) -> None:
+        # A restart keeps the header and the rows up to the generation it carries on from, the rest is counted again
+        with open(filename, newline='') as file:
+            rows = list(csv.reader(file))
+        with open(filename, 'w', newline='') as file:
+            csv.writer(file).writerows(rows[:1] + [row for row in rows[1:] if int(row[0]) <= generation])
+
+    def get_header(self) -> list:
+        return ['generation', 'fishes', 'sharks'] + list(EVENTS) + \
+            ['fish_energy_{}'.format(energy) for energy in range(self.energy_bins)] + \
+            ['shark_energy_{}'.format(energy) for energy in range(self.energy_bins)] + \
+            ['density_{}'.format(plane) for plane in range(self.shape[self.axis])]
+
+    def count(self, world: World, interior: tuple, block: tuple, row) -> None:
+        # Only the cells owned here, ghost copies would be counted twice
+        positions, species, energy = world.get_region_creatures(interior)
+        energy = numpy.clip(energy, 0, self.energy_bins - 1)
+        fishes, sharks = species == World.FISH_CELL, species == World.SHARK_CELL
+        row[0], row[1] = numpy.count_nonzero(fishes), numpy.count_nonzero(sharks)
+        row[2:2 + len(EVENTS)] = world.births, world.deaths, world.predations
+        start = 2 + len(EVENTS)
+        row[start:start + self.energy_bins] = numpy.bincount(energy[fishes], minlength=self.energy_bins)
+        start += self.energy_bins
+        row[start:start + self.energy_bins] = numpy.bincount(energy[sharks], minlength=self.energy_bins)
+        first, last = block[self.axis]
+        start += self.energy_bins + first
+        row[start:start + last - first] = numpy.bincount(positions[self.axis], minlength=last - first)
+        world.births = world.deaths = world.predations = 0
+
+    def collect(self, generation: int, world: World = None, interior: tuple = None, block: tuple = None) -> None:
+        # Workers hand their counts to a reduction that completes in the background; rank 0 waits for the sum
+        index = self.number_sent % len(self.rows)
+        self.requests[index].Wait()
+        row = self.rows[index]
+        row[:] = 0
+        if world is not None:
+            self.count(world, interior, block, row)
+        total = numpy.zeros_like(row) if self.rank == 0 else None
+        self.requests[index] = self.comm.Ireduce(row, total, op=MPI.SUM, root=0)
+        self.number_sent += 1
+        if self.rank == 0:
+            self.requests[index].Wait()
+            self.write(generation, total)
+
+    def write(self, generation: int, total) -> None:
+        start = 2 + len(EVENTS) + 2 * self.energy_bins
+        cells = numpy.prod(self.shape) // self.shape[self.axis]
+        density = total[start:] / cells
+        self.writer.writerow([generation] + total[:start].tolist() + ['{:.6g}'.format(value) for value in density])
+        self.file.flush()
+
+    def close(self) -> None:
+        MPI.Request.Waitall(self.requests)
+        if self.file is not None:
+            self.file.close()
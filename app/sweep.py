@@ -0,0 +1,132 @@
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy
+
+from app.headless import check_population, play, play_ensemble
+
+PARAMETERS = ('length', 'width', 'height', 'fish_number', 'sharks_number', 'generations', 'engine', 'periodic', 'seed')
+SUMMARY = ('final_fishes', 'final_sharks', 'mean_fishes', 'mean_sharks', 'max_fishes', 'max_sharks',
+           'fishes_extinction', 'sharks_extinction', 'duration')
+NO_EXTINCTION = -1
+
+
+def get_extinction(population) -> int:
+    extinct = numpy.flatnonzero(population == 0)
+    return int(extinct[0]) if len(extinct) else NO_EXTINCTION
+
+
+def get_summary(fishes, sharks, duration: float) -> dict:
+    return {'final_fishes': int(fishes[-1]), 'final_sharks': int(sharks[-1]),
+            'mean_fishes': float(fishes.mean()), 'mean_sharks': float(sharks.mean()),
+            'max_fishes': int(fishes.max()), 'max_sharks': int(sharks.max()),
+            'fishes_extinction': get_extinction(fishes), 'sharks_extinction': get_extinction(sharks),
+            'duration': duration}
+
+
+def simulate(run: dict) -> dict:
+    start_time = time.process_time()
+    fishes, sharks = play(run['length'], run['width'], run['height'], run['fish_number'], run['sharks_number'],
+                          run['generations'], run['engine'], run['periodic'], run['seed'])
+    return dict(run, **get_summary(fishes, sharks, time.process_time() - start_time))
+
+
+def simulate_ensemble(runs: list) -> list:
+    # Runs differing only by their seed advance together as the replicates of one ensemble, sharing its time
+    start_time = time.process_time()
+    run = runs[0]
+    fishes, sharks = play_ensemble(run['length'], run['width'], run['height'], run['fish_number'],
+                                   run['sharks_number'], run['generations'], run['periodic'],
+                                   [run['seed'] for run in runs])
+    duration = (time.process_time() - start_time) / len(runs)
+    return [dict(run, **get_summary(fishes[replicate], sharks[replicate], duration))
+            for replicate, run in enumerate(runs)]
+
+
+def get_key(run: dict) -> tuple:
+    # Runs are matched on their parameters as written in the summary file
+    return tuple(str(run[parameter]) for parameter in PARAMETERS)
+
+
+class Sweep:
+    def __init__(self, filename: str, grid: dict, seeds, defaults: dict):
+        self.filename = filename
+        names = list(grid)
+        self.runs = [dict(defaults, **dict(zip(names, values)), seed=seed)
+                     for values in itertools.product(*(grid[name] for name in names)) for seed in seeds]
+        # A combination that cannot be placed fails here, not in a worker process halfway through the sweep
+        for run in self.runs:
+            check_population(run['length'], run['width'], run['height'], run['fish_number'], run['sharks_number'])
+
+    def get_done(self) -> set:
+        if not os.path.exists(self.filename):
+            return set()
+        with open(self.filename, newline='') as file:
+            return {get_key(row) for row in csv.DictReader(file)}
+
+    def get_pending(self) -> list:
+        # An interrupted sweep resumes with the runs that have no row in the summary file yet
+        done = self.get_done()
+        return [run for run in self.runs if get_key(run) not in done]
+
+    def open(self):
+        new = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        file = open(self.filename, 'a', newline='')
+        writer = csv.DictWriter(file, fieldnames=PARAMETERS + SUMMARY)
+        if new:
+            writer.writeheader()
+        return file, writer
+
+    def run(self, workers: int = None) -> None:
+        pending = self.get_pending()
+        file, writer = self.open()
+        with file, ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(simulate, run) for run in pending]
+            # Rows are written as runs finish, so a crash only loses the runs still in flight
+            for future in as_completed(futures):
+                writer.writerow(future.result())
+                file.flush()
+
+    def run_ensemble(self, workers: int = None) -> None:
+        # Every combination of parameters is one ensemble of its pending seeds, ensembles run in parallel processes
+        groups = dict()
+        for run in self.get_pending():
+            groups.setdefault(tuple(str(run[parameter]) for parameter in PARAMETERS if parameter != 'seed'),
+                              list()).append(run)
+        file, writer = self.open()
+        with file, ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(simulate_ensemble, runs) for runs in groups.values()]
+            for future in as_completed(futures):
+                writer.writerows(future.result())
+                file.flush()
+
+    def run_mpi(self, comm) -> None:
+        # Rank 0 hands out runs one at a time and writes the rows, every other rank simulates until none are left
+        from mpi4py import MPI
+
+        rank: int = comm.Get_rank()
+        size: int = comm.Get_size()
+        if size == 1:
+            # Rank 0 alone would wait forever for ranks to simulate, local processes run the sweep instead
+            self.run()
+            return
+        if rank != 0:
+            row = None
+            while True:
+                comm.send(row, dest=0, tag=30)
+                run = comm.recv(source=0, tag=31)
+                if run is None:
+                    return
+                row = simulate(run)
+        pending = self.get_pending()
+        file, writer = self.open()
+        with file:
+            for index in range(len(pending) + size - 1):
+                status = MPI.Status()
+                row = comm.recv(source=MPI.ANY_SOURCE, tag=30, status=status)
+                if row is not None:
+                    writer.writerow(row)
+                    file.flush()
+                comm.send(pending[index] if index < len(pending) else None, dest=status.Get_source(), tag=31)
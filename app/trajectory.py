@@ -0,0 +1,121 @@
+import os
+import numpy
+
+from app.models.fish import Fish
+from app.models.shark import Shark
+
+MAGIC = b'SHRKFISH'
+VERSION = 1
+NO_SEED = -1
+
+# Fixed-size little-endian header, followed by one fixed-size frame per saved generation
+HEADER_DTYPE = numpy.dtype([('magic', 'S8'),
+                            ('version', '<u4'),
+                            ('shape', '<u4', (3,)),
+                            ('interval', '<u4'),
+                            ('fish_fertility', '<u2'),
+                            ('fish_energy', '<u2'),
+                            ('shark_fertility', '<u2'),
+                            ('shark_energy', '<u2'),
+                            ('seed', '<i8')])
+FRAME_HEAD_DTYPE = numpy.dtype([('generation', '<u4'), ('fishes', '<u8'), ('sharks', '<u8')])
+
+
+def get_frame_dtype(shape: tuple) -> numpy.dtype:
+    return numpy.dtype(FRAME_HEAD_DTYPE.descr + [('species', 'u1', tuple(shape))])
+
+
+def get_header(shape: tuple, interval: int, seed: int = None):
+    header = numpy.zeros((), dtype=HEADER_DTYPE)
+    header['magic'] = MAGIC
+    header['version'] = VERSION
+    header['shape'] = shape
+    header['interval'] = interval
+    header['fish_fertility'] = Fish.FERTILITY_THRESHOLD
+    header['fish_energy'] = Fish.ENERGY
+    header['shark_fertility'] = Shark.FERTILITY_THRESHOLD
+    header['shark_energy'] = Shark.ENERGY
+    header['seed'] = NO_SEED if seed is None else seed
+    return header
+
+
+def get_frame_head(generation: int, fishes: int, sharks: int):
+    head = numpy.zeros((), dtype=FRAME_HEAD_DTYPE)
+    head['generation'] = generation
+    head['fishes'] = fishes
+    head['sharks'] = sharks
+    return head
+
+
+def count_frames_before(filename: str, shape: tuple, generation: int) -> int:
+    # How many frames of an earlier run come before the generation a restart carries on from; the ones from there on
+    # are written again by the restarted run
+    if not os.path.exists(filename):
+        return 0
+    reader = TrajectoryReader(filename)
+    if reader.shape != tuple(shape):
+        raise ValueError('{} holds a {} world, not a {} one.'.format(filename, reader.shape, tuple(shape)))
+    return int(numpy.searchsorted(reader.frames['generation'], generation))
+
+
+class TrajectoryWriter:
+    def __init__(self, filename: str, shape: tuple, interval: int = 1, seed: int = None,
+                 first_generation: int = None):
+        self.filename = filename
+        self.shape = tuple(shape)
+        if first_generation is None or not os.path.exists(filename):
+            self.file = open(filename, 'wb')
+            self.file.write(get_header(self.shape, interval, seed).tobytes())
+            return
+        # A restart keeps the header and the frames saved before its first generation
+        frames = count_frames_before(filename, self.shape, first_generation)
+        self.file = open(filename, 'r+b')
+        self.file.truncate(HEADER_DTYPE.itemsize + frames * get_frame_dtype(self.shape).itemsize)
+        self.file.seek(0, os.SEEK_END)
+
+    def append(self, generation: int, species) -> None:
+        # Frames are appended as they come: the fixed-size head, then the species grid bytes without a copy
+        fishes = numpy.count_nonzero(species == Fish.SPECIES)
+        sharks = numpy.count_nonzero(species == Shark.SPECIES)
+        self.file.write(get_frame_head(generation, fishes, sharks).tobytes())
+        self.file.write(numpy.ascontiguousarray(species, dtype=numpy.uint8))
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class TrajectoryReader:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.header = numpy.fromfile(filename, dtype=HEADER_DTYPE, count=1)[0]
+        if self.header['magic'] != MAGIC:
+            raise ValueError('{} is not a trajectory file.'.format(filename))
+        self.shape = tuple(int(axis) for axis in self.header['shape'])
+        self.interval = int(self.header['interval'])
+        self.seed = None if self.header['seed'] == NO_SEED else int(self.header['seed'])
+        # Only the frames that are touched are read from disk
+        frame_dtype = get_frame_dtype(self.shape)
+        number_frames = (os.path.getsize(filename) - HEADER_DTYPE.itemsize) // frame_dtype.itemsize
+        self.frames = numpy.memmap(filename, dtype=frame_dtype, mode='r', offset=HEADER_DTYPE.itemsize,
+                                   shape=(number_frames,))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, index: int):
+        return self.frames[index]['species']
+
+    def get_generation(self, generation: int):
+        index = numpy.searchsorted(self.frames['generation'], generation)
+        if index == len(self.frames) or self.frames[index]['generation'] != generation:
+            raise KeyError('Generation {} is not in {}.'.format(generation, self.filename))
+        return self[index]
+
+    def get_initial_species(self, shape: tuple, frame: int = -1):
+        # A saved frame the world starts from, read lazily so that every worker only touches its block
+        if self.shape != tuple(shape):
+            raise ValueError('{} holds a {} world, not a {} one.'.format(self.filename, self.shape, tuple(shape)))
+        return self[frame]
+
+    def get_populations(self):
+        return self.frames['generation'], self.frames['fishes'], self.frames['sharks']
@@ -3,17 +3,30 @@ import logging
 
 
 def logger(name, log_file, level=logging.INFO):
-    handler = logging.FileHandler(log_file)
-    handler.setFormatter(formatter)
+    # Loggers stay silent until init_logging opens their files, so that processes that do not log open nothing,
+    # and calls below their level return at once
     log = logging.getLogger(name)
-    log.setLevel(level)
-    log.addHandler(handler)
+    log.setLevel(logging.CRITICAL + 1)
+    log.addHandler(logging.NullHandler())
+    log.propagate = False
+    log_files[name] = (log_file, level)
     return log
 
 
+def init_logging():
+    for name, (log_file, level) in log_files.items():
+        handler = logging.FileHandler(log_file, delay=True)
+        handler.setFormatter(formatter)
+        log = logging.getLogger(name)
+        log.setLevel(level)
+        log.addHandler(handler)
+
+
 ROOT_DIR: str = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR: str = os.path.dirname(os.path.abspath(__file__)) + '/data'
+# Output files and directories left at None are placed in DATA_DIR once the settings are configured
 formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+log_files = dict()
 
 FISH_NUMBER: int = 1000
 SHARKS_NUMBER: int = 200
@@ -24,5 +37,124 @@ WORLD_HEIGHT: int = 20
 
 MAX_GENERATIONS: int = 20
 
+# Start from frame INITIAL_FRAME of a saved trajectory instead of FISH_NUMBER fishes and SHARKS_NUMBER sharks placed
+# at random; the trajectory must hold the whole world
+INITIAL_TRAJECTORY: str = None
+INITIAL_FRAME: int = -1
+
+# Every CHECKPOINT_INTERVAL generations (0: never) and at the end, the world is saved to CHECKPOINT_DIR while it keeps
+# evolving; `python __main__.py --restart` carries on from the last complete checkpoint, on any number of processes
+CHECKPOINT_INTERVAL: int = 0
+CHECKPOINT_DIR: str = None
+
+# Seed of every random stream; None draws a new one, written to the log and the trajectory header
+SEED: int = None
+
+# World engine used by every process: 'object', 'vectorized', 'sparse' (creatures kept as records, halos carrying only
+# them) or 'auto'; 'auto' goes sparse while creatures fill under SPARSE_DENSITY of the cells and back to 'vectorized'
+# over twice that, checked every SPARSE_CHECK_INTERVAL generations
+ENGINE: str = 'object'
+SPARSE_DENSITY: float = 0.005
+SPARSE_CHECK_INTERVAL: int = 10
+
+# Workers are laid out as a grid of blocks, DECOMPOSITION_DIMS holding the number of blocks along the length, width and
+# height of the world, 0 letting MPI choose: (1, 0, 1) cuts it into slabs, (0, 0, 1) into columns, (0, 0, 0) into cubes.
+# Blocks along an axis differ by at most one cell, so any number of workers fits.
+DECOMPOSITION_DIMS: tuple = (1, 0, 1)
+
+# Every BALANCE_INTERVAL generations (0 never) the block boundaries move to even out the evolution time of the workers,
+# when the slowest one takes over BALANCE_THRESHOLD times the mean; BALANCE_CELL_WEIGHT is the cost of an empty cell
+# next to the cost of a creature.
+BALANCE_INTERVAL: int = 0
+BALANCE_THRESHOLD: float = 1.2
+BALANCE_CELL_WEIGHT: float = 0.05
+
+# Overlap the border exchange with the evolution of the interior columns
+PIPELINED_HALO: bool = False
+
+# Every worker evolves its block with THREADS threads over sub-blocks coloured so that those of one colour cannot meet:
+# cubes of THREAD_BLOCK cells, or 2 * THREADS slabs across the longest axis with THREAD_BLOCK = 0. The trajectory
+# depends on the sub-blocks, not on the threads. Only the vectorized engine has block kernels, others run serially.
+# One thread, the default, starts no pool: see the README for what BENCHMARK_THREADS measured.
+THREADS: int = 1
+THREAD_BLOCK: int = 0
+
+# Generation phases are always timed; PROFILE adds finer timings (neighbour lookup, halo post and wait, packing,
+# merging, snapshot receiving and rendering) and byte and creature counters, summed over the processes at the end;
+# PROFILE_TRACE names a Chrome trace / Perfetto JSON timeline to write, and implies PROFILE
+PROFILE: bool = False
+PROFILE_TRACE: str = None
+
+# Run the whole world in a single process without MPI
+HEADLESS: bool = False
+
+# The world is a torus: creatures leaving it on one side come back on the other, across workers too
+PERIODIC: bool = False
+
+# Run a parameter sweep instead of a single world: every combination of the SWEEP_GRID values (parameters left out
+# keep the values above) is run headless once per seed in SWEEP_SEEDS, by SWEEP_WORKERS processes or, with the 'mpi'
+# executor, by every rank but 0. The 'ensemble' executor advances all the seeds of a combination together as the
+# replicates of one array, combinations spread over SWEEP_WORKERS processes; each replicate evolves as the 'vectorized'
+# engine would. Each run appends a summary row to SWEEP_FILE; rerunning resumes the sweep.
+SWEEP: bool = False
+SWEEP_GRID: dict = {}
+SWEEP_SEEDS: tuple = (0, 1, 2)
+SWEEP_EXECUTOR: str = 'process'
+SWEEP_WORKERS: int = None
+SWEEP_FILE: str = None
+
+# Benchmark instead of a single world: on every rank count of BENCHMARK_RANKS (rank 0 only coordinates) each engine
+# runs the BENCHMARK_SIZES worlds for strong scaling and a world of one BENCHMARK_BLOCK per worker for weak scaling,
+# BENCHMARK_GENERATIONS generations from BENCHMARK_SEED, creatures filling the given fractions of the cells, once per
+# THREADS count of BENCHMARK_THREADS. Results are appended to BENCHMARK_FILE as JSON lines, the speedup and efficiency
+# tables, threads included, are written to BENCHMARK_REPORT.
+BENCHMARK: bool = False
+BENCHMARK_RANKS: tuple = (2, 3, 5, 9)
+BENCHMARK_SIZES: tuple = ((40, 48, 40),)
+BENCHMARK_BLOCK: tuple = (40, 12, 40)
+BENCHMARK_GENERATIONS: int = 20
+BENCHMARK_ENGINES: tuple = ('object', 'vectorized')
+BENCHMARK_FISH_DENSITY: float = 0.1
+BENCHMARK_SHARKS_DENSITY: float = 0.02
+BENCHMARK_SEED: int = 0
+BENCHMARK_THREADS: tuple = (1,)
+BENCHMARK_FILE: str = None
+BENCHMARK_REPORT: str = None
+
+# Every generation the workers count the creatures, births, deaths and predations of their own cells, the energy of
+# each species in STATISTICS_ENERGY_BINS bins (the last one holding all higher energies) and the density of every
+# plane across STATISTICS_AXIS; the sums are written to STATISTICS_FILE as one CSV row a generation
+STATISTICS: bool = True
+STATISTICS_FILE: str = None
+STATISTICS_AXIS: int = 1
+STATISTICS_ENERGY_BINS: int = 32
+
+# Snapshots are taken every SNAPSHOT_INTERVAL generations (0 disables them), optionally cropped to
+# SNAPSHOT_REGION = ((x_start, x_stop), (y_start, y_stop), (z_start, z_stop)), and written by SNAPSHOT_WRITERS
+# 'thread' or 'process' writers; at most SNAPSHOT_QUEUE frames wait for a writer.
+SNAPSHOT_INTERVAL: int = 1
+SNAPSHOT_REGION = None
+SNAPSHOT_WRITERS: int = 1
+SNAPSHOT_QUEUE: int = 4
+SNAPSHOT_EXECUTOR: str = 'thread'
+
+# Snapshots are rendered to PNG files in DATA_DIR and/or appended to the binary TRAJECTORY_FILE
+OUTPUT_FORMATS: tuple = ('png',)
+# PNG view: 'depth', 'max' or 'slice' raster images, or the slow matplotlib 'voxels' plot; pixels per cell
+RENDER_VIEW: str = 'depth'
+RENDER_SCALE: int = 8
+TRAJECTORY_FILE: str = None
+
+# Render every frame of TRAJECTORY_FILE to PNG files in DATA_DIR instead of running a world, with RENDER_WORKERS
+# processes (None: one a core), in any RENDER_VIEW but 'voxels'
+RENDER: bool = False
+RENDER_WORKERS: int = None
+
+# Workers write their own slab of the trajectory into the shared file with MPI-IO instead of sending it to rank 0
+COLLECTIVE_OUTPUT: bool = False
+
+# Write the MPI and debug logs, also turned on by --log
+LOGGING: bool = False
+
 MPILogger = logger('sharks_and_fishes_mpi_log', 'sharks_and_fishes_mpi.log')
 DebugLogger = logger('sharks_and_fishes_debug_log', 'sharks_and_fishes_debug.log', logging.DEBUG)
@@ -0,0 +1,34 @@
+import unittest
+
+import numpy
+
+from app.balance import get_balanced_cuts
+
+
+class BalancedCutsTest(unittest.TestCase):
+    def assert_blocks(self, cuts: list, size: int, blocks: int):
+        self.assertEqual((cuts[0], cuts[-1], len(cuts)), (0, size, blocks + 1))
+        self.assertTrue((numpy.diff(cuts) >= 1).all(), cuts)
+
+    def test_even_load_gives_even_blocks(self):
+        cuts = get_balanced_cuts(numpy.ones(12), 4)
+        self.assertEqual(cuts, [0, 3, 6, 9, 12])
+
+    def test_load_moves_the_cuts(self):
+        profile = numpy.ones(12)
+        profile[:3] = 10
+        cuts = get_balanced_cuts(profile, 3)
+        self.assert_blocks(cuts, 12, 3)
+        self.assertLess(cuts[1], 4)
+
+    def test_every_block_keeps_one_cell(self):
+        for position in (0, 5, 9):
+            profile = numpy.zeros(10)
+            profile[position] = 1
+            for blocks in (2, 5, 10):
+                self.assert_blocks(get_balanced_cuts(profile, blocks), 10, blocks)
+        self.assertEqual(get_balanced_cuts(numpy.arange(10.0), 10), list(range(11)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+
+import setup
+from app import config
+
+
+class ConfigTest(unittest.TestCase):
+    def setUp(self):
+        # Settings are module attributes of setup.py, put back as they were after every test
+        self.settings = {name: getattr(setup, name) for name in config.SETTINGS}
+        self.derived = set(config.derived)
+        self.addCleanup(self.restore)
+
+    def restore(self):
+        for name, value in self.settings.items():
+            setattr(setup, name, value)
+        config.derived.clear()
+        config.derived.update(self.derived)
+
+    def test_command_line_values_are_parsed(self):
+        settings, _ = config.parse_arguments(['--world-length', '40', '--engine', 'vectorized',
+                                              '--decomposition-dims', '[0, 0, 1]', '--balance-threshold', '2'])
+        config.configure(settings)
+        self.assertEqual(setup.WORLD_LENGTH, 40)
+        self.assertEqual(setup.ENGINE, 'vectorized')
+        self.assertEqual(setup.DECOMPOSITION_DIMS, (0, 0, 1))
+        self.assertEqual(setup.BALANCE_THRESHOLD, 2.0)
+        self.assertIsInstance(setup.BALANCE_THRESHOLD, float)
+
+    def test_command_line_overrides_config_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            json.dump({'world_width': 30, 'fish_number': 70}, file)
+        self.addCleanup(os.remove, file.name)
+        settings, _ = config.parse_arguments(['--config', file.name, '--fish-number', '90'])
+        config.configure(settings)
+        self.assertEqual((setup.WORLD_WIDTH, setup.FISH_NUMBER), (30, 90))
+
+    def test_invalid_settings_are_rejected(self):
+        for settings in ({'NO_SUCH_SETTING': 1}, {'WORLD_LENGTH': 'long'}, {'SEED': 2 ** 63}, {'SEED': -1}):
+            with self.subTest(settings=settings), self.assertRaises(ValueError):
+                config.configure(settings)
+
+    def test_output_paths_follow_the_data_directory(self):
+        config.configure({'DATA_DIR': '/tmp/first'})
+        self.assertEqual(setup.TRAJECTORY_FILE, os.path.join('/tmp/first', 'world.traj'))
+        config.configure({'TRAJECTORY_FILE': '/tmp/own.traj'})
+        config.configure({'DATA_DIR': '/tmp/second'})
+        self.assertEqual(setup.TRAJECTORY_FILE, '/tmp/own.traj')
+        self.assertEqual(setup.CHECKPOINT_DIR, os.path.join('/tmp/second', 'checkpoints'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from app.decomposition import Decomposition
+
+
+class DecompositionTest(unittest.TestCase):
+    def test_shares_add_up_in_proportion_to_the_blocks(self):
+        decomposition = Decomposition((10, 9, 8), 4, (2, 2, 1))
+        for number in (0, 1, 7, 250, 719):
+            shares = [decomposition.get_share(number, index) for index in range(decomposition.workers)]
+            self.assertEqual(sum(shares), number)
+            for index, share in enumerate(shares):
+                (x_start, x_stop), (y_start, y_stop), (z_start, z_stop) = decomposition.get_block(index)
+                cells = (x_stop - x_start) * (y_stop - y_start) * (z_stop - z_start)
+                self.assertLessEqual(abs(share - number * cells / 720), 1)
+
+    def test_neighbours_stop_at_the_edges(self):
+        decomposition = Decomposition((10, 9, 8), 4, (2, 2, 1))
+        self.assertEqual(decomposition.dims, (2, 2, 1))
+        self.assertEqual(decomposition.get_neighbour(0, (1, 0, 0)), 2)
+        self.assertEqual(decomposition.get_neighbour(0, (1, 1, 0)), 3)
+        self.assertIsNone(decomposition.get_neighbour(0, (-1, 0, 0)))
+        self.assertIsNone(decomposition.get_neighbour(3, (0, 1, 0)))
+        self.assertIsNone(decomposition.get_neighbour(0, (0, 0, 1)))
+
+    def test_neighbours_wrap_around_periodic_axes(self):
+        decomposition = Decomposition((10, 9, 8), 6, (3, 2, 1), periodic=True)
+        self.assertEqual(decomposition.get_neighbour(0, (-1, 0, 0)), 4)
+        self.assertEqual(decomposition.get_neighbour(5, (1, 1, 0)), 0)
+        # An axis that is not cut wraps around inside every block, not across workers
+        self.assertIsNone(decomposition.get_neighbour(0, (0, 0, 1)))
+        self.assertEqual(decomposition.get_local_periodic(), (False, False, True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+import numpy
+
+from app.engines import ENGINES
+from app.headless import play, play_ensemble
+
+
+class EngineRulesTest(unittest.TestCase):
+    SHAPE = (12, 12, 12)
+    SEEDS = range(8)
+
+    def get_populations(self, engine: str):
+        # Fishes and sharks of every generation, a row per seed
+        return numpy.array([play(*self.SHAPE, 300, 60, 12, engine, seed=seed) for seed in self.SEEDS])
+
+    def test_populations_match_object_engine_every_generation(self):
+        # Crowded worlds, where creatures keep contending for the same cells
+        populations = self.get_populations('object')
+        for engine in ('vectorized', 'sparse'):
+            with self.subTest(engine=engine):
+                numpy.testing.assert_array_equal(self.get_populations(engine), populations)
+
+    def test_same_seed_same_world(self):
+        # Creatures act one after the other in the same order with the same draws, whichever the engine
+        worlds = list()
+        for engine in ('object', 'vectorized'):
+            world = ENGINES[engine](10, 9, 8, True, 7)
+            world.populate_world(150, 30)
+            world.run(10)
+            worlds.append(world)
+        numpy.testing.assert_array_equal(worlds[0].get_species_grid(), worlds[1].get_species_grid())
+
+    def test_sparse_matches_vectorized(self):
+        worlds = [ENGINES[engine](14, 12, 10, False, 3) for engine in ('sparse', 'vectorized')]
+        runs = list()
+        for world in worlds:
+            world.populate_world(120, 30)
+            runs.append(world.run(10))
+        numpy.testing.assert_array_equal(runs[0], runs[1])
+        numpy.testing.assert_array_equal(worlds[0].get_species_grid(), worlds[1].get_species_grid())
+
+    def test_ensemble_replicates_match_single_runs(self):
+        seeds = (4, 5, 6)
+        fishes, sharks = play_ensemble(10, 10, 10, 150, 40, 8, seeds=seeds)
+        for replicate, seed in enumerate(seeds):
+            with self.subTest(seed=seed):
+                single_fishes, single_sharks = play(10, 10, 10, 150, 40, 8, 'vectorized', seed=seed)
+                numpy.testing.assert_array_equal(fishes[replicate], single_fishes)
+                numpy.testing.assert_array_equal(sharks[replicate], single_sharks)
+
+    def test_events_account_for_population_change(self):
+        world = ENGINES['object'](12, 12, 12, False, 9)
+        world.populate_world(300, 60)
+        fishes, sharks = world.run(12)
+        self.assertEqual(fishes[-1] + sharks[-1] - fishes[0] - sharks[0],
+                         world.births - world.deaths - world.predations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from app.sweep import Sweep
+
+DEFAULTS = {'length': 6, 'width': 6, 'height': 6, 'fish_number': 20, 'sharks_number': 5, 'generations': 3,
+            'engine': 'vectorized', 'periodic': False}
+
+
+class SweepTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'sweep.csv')
+
+    def read(self) -> list:
+        with open(self.filename, newline='') as file:
+            return list(csv.DictReader(file))
+
+    def test_resume_skips_completed_runs(self):
+        Sweep(self.filename, {'fish_number': (20,)}, (0,), DEFAULTS).run(1)
+        first = self.read()
+        sweep = Sweep(self.filename, {'fish_number': (20, 30)}, (0, 1), DEFAULTS)
+        self.assertEqual(sorted((run['fish_number'], run['seed']) for run in sweep.get_pending()),
+                         [(20, 1), (30, 0), (30, 1)])
+        sweep.run(1)
+        rows = self.read()
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0], first[0])
+        self.assertEqual(sweep.get_pending(), [])
+
+    def test_population_must_fit(self):
+        with self.assertRaises(ValueError):
+            Sweep(self.filename, {'fish_number': (300,)}, (0,), DEFAULTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
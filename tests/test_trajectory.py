@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+import numpy
+
+from app.render import render_trajectory
+from app.trajectory import TrajectoryReader, TrajectoryWriter
+
+
+class TrajectoryTest(unittest.TestCase):
+    SHAPE = (4, 5, 6)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, 'world.traj')
+        random = numpy.random.default_rng(0)
+        self.frames = {generation: random.integers(0, 3, self.SHAPE, dtype=numpy.uint8) for generation in (0, 2, 4)}
+
+    def write(self, seed=None):
+        writer = TrajectoryWriter(self.filename, self.SHAPE, 2, seed)
+        for generation, species in self.frames.items():
+            writer.append(generation, species)
+        writer.close()
+        return TrajectoryReader(self.filename)
+
+    def test_round_trip(self):
+        reader = self.write(seed=123)
+        self.assertEqual((reader.shape, reader.interval, reader.seed), (self.SHAPE, 2, 123))
+        self.assertEqual(len(reader), len(self.frames))
+        for index, species in enumerate(self.frames.values()):
+            numpy.testing.assert_array_equal(reader[index], species)
+        generations, fishes, sharks = reader.get_populations()
+        numpy.testing.assert_array_equal(generations, list(self.frames))
+        frames = list(self.frames.values())
+        numpy.testing.assert_array_equal(fishes, [numpy.count_nonzero(species == 1) for species in frames])
+        numpy.testing.assert_array_equal(sharks, [numpy.count_nonzero(species == 2) for species in frames])
+
+    def test_frames_are_memory_mapped(self):
+        reader = self.write()
+        self.assertIsNone(reader.seed)
+        self.assertIsInstance(reader.frames, numpy.memmap)
+        numpy.testing.assert_array_equal(reader.get_generation(4), self.frames[4])
+        with self.assertRaises(KeyError):
+            reader.get_generation(3)
+
+    def test_initial_species_must_match_the_world(self):
+        reader = self.write()
+        numpy.testing.assert_array_equal(reader.get_initial_species(self.SHAPE), self.frames[4])
+        with self.assertRaises(ValueError):
+            reader.get_initial_species((4, 5, 7))
+
+    def test_render_every_frame(self):
+        self.write()
+        pattern = os.path.join(os.path.dirname(self.filename), 'world-{:04d}.png')
+        render_trajectory(self.filename, pattern, 'max', workers=2)
+        for generation in self.frames:
+            with open(pattern.format(generation + 1), 'rb') as file:
+                self.assertEqual(file.read(8), b'\x89PNG\r\n\x1a\n')
+        with self.assertRaises(ValueError):
+            render_trajectory(self.filename, pattern, 'voxels')
+
+
+if __name__ == '__main__':
+    unittest.main()